@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+EPG dönüşüm benchmark'ı: ET.parse (ağaç) modu vs tek geçişli akış modu
+
+Sentetik bir XMLTV dosyası üretir, her modu ayrı bir süreçte çalıştırır ve
+süre, throughput ve tepe RSS değerlerini raporlar.
+
+Kullanım: python benchmarks/bench_epg.py --size-mb 100
+"""
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHANNEL_NAMES = ["TRT 1 HD", "Show TV", "Kanal D HD", "ATV", "Star TV HD", "FOX", "TV8",
+                 "Beyaz TV", "Halk TV", "Sözcü TV", "NTV", "CNN Türk HD", "Habertürk",
+                 "TRT Spor", "A Spor", "TRT Çocuk", "Minika Çocuk", "TLC", "DMAX", "Teve2"]
+
+
+def generate_epg(path, size_mb, channels=400):
+    """Hedef boyuta ulaşana kadar programme girdileri olan XMLTV dosyası yaz"""
+    target = size_mb * 1024 * 1024
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<tv generator-info-name="bench">\n')
+        ids = []
+        for i in range(channels):
+            name = f"{CHANNEL_NAMES[i % len(CHANNEL_NAMES)]} {i}"
+            ch_id = f"ch{i}.tr"
+            ids.append(ch_id)
+            f.write(f'  <channel id={quoteattr(ch_id)}>\n'
+                    f'    <display-name lang="tr">{escape(name)}</display-name>\n'
+                    f'    <icon src="https://example.com/logo/{i}.png"/>\n'
+                    f'  </channel>\n')
+        written = f.tell()
+        n = 0
+        while written < target:
+            ch_id = ids[n % channels]
+            hour = (n // channels) % 24
+            block = (f'  <programme start="20260101{hour:02d}0000 +0300" stop="20260101{hour:02d}5900 +0300" '
+                     f'channel={quoteattr(ch_id)}>\n'
+                     f'    <title lang="tr">Program {n}</title>\n'
+                     f'    <desc lang="tr">{"Açıklama " * rng.randint(5, 25)}</desc>\n'
+                     f'    <category lang="tr">Dizi</category>\n'
+                     f'  </programme>\n')
+            f.write(block)
+            written += len(block.encode('utf-8'))
+            n += 1
+        f.write('</tv>\n')
+    return os.path.getsize(path)
+
+
+def run_mode(mode, input_path, output_dir):
+    """Tek bir modu bu süreçte çalıştır, sonuç satırını bas"""
+    import main
+
+    # Zaman penceresini kapat (sentetik tarihler sabit); tekrar/çakışma ayıklama iki modda da açık
+    main.EPG_PAST_HOURS = main.EPG_FUTURE_HOURS = ""
+
+    output_path = os.path.join(output_dir, f'epg_{mode}.xml')
+    id_path = os.path.join(output_dir, f'kanalid_{mode}.txt')
+    start = time.perf_counter()
+
+    if mode == 'tree':
+        main.LOCAL_XML = input_path
+        main.UPDATED_XML = output_path
+        main.CHANNEL_ID_FILE = id_path
+        main.update_channels()
+    else:
+        def chunks():
+            with open(input_path, 'rb') as f:
+                while True:
+                    chunk = f.read(main.CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        main.rewrite_epg_stream(chunks(), output_path, id_path, main.make_window())
+
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"RESULT {mode} {elapsed:.3f} {peak_kb} {os.path.getsize(output_path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark EPG rewrite modes')
+    parser.add_argument('--size-mb', type=float, default=100, help='Synthetic EPG size')
+    parser.add_argument('--input', help='Use an existing XMLTV file instead of generating one')
+    parser.add_argument('--modes', default='tree,stream', help='Modes to run')
+    parser.add_argument('--run', choices=['tree', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('--output-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(args.run, args.input, args.output_dir)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='bench_epg_') as tmp:
+        input_path = args.input
+        if not input_path:
+            input_path = os.path.join(tmp, 'epg.xml')
+            print(f"Generating {args.size_mb:g} MB synthetic EPG...")
+            generate_epg(input_path, args.size_mb)
+        size = os.path.getsize(input_path)
+        print(f"Input: {size / 1024 / 1024:.1f} MB")
+        print(f"{'mode':8} {'time s':>8} {'MB/s':>8} {'peak RSS MB':>12} {'output MB':>10}")
+
+        for mode in args.modes.split(','):
+            # Her mod ayrı süreçte: tepe RSS birbirini etkilemesin
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', mode,
+                 '--input', input_path, '--output-dir', tmp],
+                capture_output=True, text=True, cwd=tmp,
+            )
+            line = next((l for l in proc.stdout.splitlines() if l.startswith('RESULT')), None)
+            if not line:
+                print(f"{mode:8} failed:\n{proc.stderr}")
+                continue
+            _, _, elapsed, peak_kb, out_size = line.split()
+            elapsed = float(elapsed)
+            print(f"{mode:8} {elapsed:8.2f} {size / 1024 / 1024 / elapsed:8.1f} "
+                  f"{int(peak_kb) / 1024:12.1f} {int(out_size) / 1024 / 1024:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+HLS master playlist micro-benchmark: eski reverse_hls_quality vs hls modeli
+
+Kullanım: python benchmarks/bench_hls.py [--variants 8] [--number 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hls  # noqa: E402
+
+# YouTube HLS manifest'lerindeki kalite basamakları (düşükten yükseğe)
+LADDER = [
+    (144, 256, 290000, "avc1.4d400c"),
+    (240, 426, 546000, "avc1.4d4015"),
+    (360, 640, 1209000, "avc1.4d401e"),
+    (480, 854, 1568000, "avc1.4d401f"),
+    (720, 1280, 2969000, "avc1.4d401f"),
+    (1080, 1920, 5420000, "avc1.640028"),
+    (1440, 2560, 9000000, "avc1.640032"),
+    (2160, 3840, 16000000, "avc1.640033"),
+]
+
+
+def legacy_reverse_hls_quality(m3u8_content):
+    """update_streams.py'deki eski konuma göre ters çevirme (referans)"""
+    if not m3u8_content:
+        return ""
+
+    lines = m3u8_content.split('\n')
+    stream_blocks = []
+    current_block = []
+
+    for line in lines:
+        if line.startswith('#EXTM3U'):
+            continue
+        elif line.startswith('#EXT-X-STREAM-INF'):
+            if current_block:
+                stream_blocks.append(current_block)
+            current_block = [line]
+        elif current_block:
+            current_block.append(line)
+            if line and not line.startswith('#'):
+                stream_blocks.append(current_block)
+                current_block = []
+
+    if current_block:
+        stream_blocks.append(current_block)
+
+    stream_blocks.reverse()
+    result = ['#EXTM3U']
+    for block in stream_blocks:
+        result.extend(block)
+
+    return '\n'.join(result)
+
+
+def make_master(variant_count):
+    """YouTube benzeri sentetik master playlist üret"""
+    lines = ['#EXTM3U', '#EXT-X-INDEPENDENT-SEGMENTS']
+    for i in range(variant_count):
+        height, width, bandwidth, codec = LADDER[i % len(LADDER)]
+        lines.append(
+            f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth + i},CODECS="{codec},mp4a.40.2",'
+            f'RESOLUTION={width}x{height},FRAME-RATE=30,VIDEO-RANGE=SDR,CLOSED-CAPTIONS=NONE'
+        )
+        lines.append(
+            'https://manifest.googlevideo.com/api/manifest/hls_playlist/expire/1700000000/'
+            f'ei/abcdefgh/ip/1.2.3.4/id/xyz.{i}/itag/{90 + i}/source/yt_live_broadcast/'
+            'sig/AOq0QJ8wRQIhAJ1234567890abcdef/file/index.m3u8'
+        )
+    return '\n'.join(lines)
+
+
+def new_sort(text):
+    return hls.parse_master(text).sort_by_bandwidth().dumps()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HLS master playlist reordering')
+    parser.add_argument('--variants', type=int, default=8, help='Variants per playlist')
+    parser.add_argument('--number', type=int, default=2000, help='Calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements (best is reported)')
+    args = parser.parse_args()
+
+    text = make_master(args.variants)
+    print(f"Playlist: {args.variants} variants, {len(text)} bytes")
+
+    results = {}
+    for name, func in (('legacy reverse_hls_quality', legacy_reverse_hls_quality),
+                       ('hls.parse_master + sort + dumps', new_sort),
+                       ('hls.parse_master only', hls.parse_master)):
+        best = min(timeit.repeat(lambda: func(text), number=args.number, repeat=args.repeat))
+        results[name] = best / args.number * 1e6
+        print(f"  {name:34} {results[name]:8.1f} µs/call")
+
+    # Sıralamalar aynı sonucu vermeli (YouTube düşükten yükseğe verdiğinde)
+    legacy = legacy_reverse_hls_quality(text).split('\n')
+    modern = new_sort(text).split('\n')
+    same_uris = [l for l in legacy if not l.startswith('#')] == [l for l in modern if not l.startswith('#')]
+    print(f"Same variant order as legacy: {'yes' if same_uris else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+update_streams.py için çevrimdışı benchmark - sahte Invidious cluster'ına karşı çalışır
+
+Kullanım:
+    python benchmarks/bench_updater.py --sizes 10,100,1000 --concurrency 8
+    python benchmarks/bench_updater.py --sizes 100 --dead 1 --dead-mode hang --passes 2
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_invidious import FakeCluster  # noqa: E402
+from run_metrics import percentile  # noqa: E402
+
+SUBFOLDERS = ['haber', 'spor', 'dizi', 'belgesel', 'cocuk']
+
+
+def make_config(path, count):
+    """count adet sentetik kanal girdisi yaz"""
+    streams = [
+        {
+            'type': 'channel',
+            'name': f'Bench {i}',
+            'slug': f'bench{i:04d}',
+            'id': f'UCbench{i:017d}',
+            'subfolder': SUBFOLDERS[i % len(SUBFOLDERS)],
+        }
+        for i in range(count)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(streams, f)
+
+
+def run_once(cluster, config_path, workdir, args):
+    """update_streams.main()'i bir kez çalıştır, ölçümleri döndür"""
+    import update_streams
+    updater = importlib.reload(update_streams)
+    updater.RETRY_DELAY = args.retry_delay
+
+    # process_stream'i sararak stream başına süreyi ölç
+    latencies = []
+    lock = threading.Lock()
+    original = updater.process_stream
+
+    def timed_process_stream(stream, index, total):
+        start = time.perf_counter()
+        try:
+            return original(stream, index, total)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    updater.process_stream = timed_process_stream
+
+    argv = [
+        'update_streams.py', str(config_path),
+        '--folder', str(workdir / 'out'),
+        '--instances', ','.join(cluster.instances),
+        '--timeout', str(args.timeout),
+        '--retries', str(args.retries),
+        '--concurrency', str(args.concurrency),
+        '--health-file', str(workdir / 'health.json') if args.with_state else '',
+        '--live-cache', str(workdir / 'live_cache.json') if args.with_state else '',
+        '--journal', str(workdir / 'journal.jsonl'),
+    ]
+
+    cluster.stats.reset()
+    output = io.StringIO()
+    old_argv = sys.argv
+    sys.argv = argv
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            updater.main()
+    finally:
+        sys.argv = old_argv
+    wall = time.perf_counter() - start
+
+    summary = [line for line in output.getvalue().splitlines() if 'Complete:' in line]
+    return {
+        'wall_s': round(wall, 3),
+        'requests': cluster.stats.total,
+        'requests_by_kind': dict(cluster.stats.by_kind),
+        'p50_s': round(percentile(latencies, 50), 4),
+        'p95_s': round(percentile(latencies, 95), 4),
+        'p99_s': round(percentile(latencies, 99), 4),
+        'mean_s': round(statistics.mean(latencies), 4) if latencies else 0.0,
+        'summary': summary[-1].strip() if summary else '',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark for update_streams.py')
+    parser.add_argument('--sizes', default='10,100,1000', help='Comma-separated stream counts')
+    parser.add_argument('--concurrency', type=int, default=8, help='Updater --concurrency')
+    parser.add_argument('--hosts', type=int, default=5, help='Fake Invidious instances')
+    parser.add_argument('--dead', type=int, default=1, help='Dead instances among them')
+    parser.add_argument('--dead-mode', choices=['refuse', 'hang'], default='refuse')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean API latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Latency jitter (s)')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='HTTP 500 probability')
+    parser.add_argument('--timeout', type=int, default=2, help='Updater request timeout (s)')
+    parser.add_argument('--retries', type=int, default=2, help='Updater max retries')
+    parser.add_argument('--retry-delay', type=float, default=0.1, help='Updater retry base delay (s)')
+    parser.add_argument('--passes', type=int, default=1,
+                        help='Runs per size sharing state files (pass 2+ is a warm run)')
+    parser.add_argument('--no-state', dest='with_state', action='store_false',
+                        help='Disable health/live-cache state files')
+    parser.add_argument('--json', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = []
+
+    print(f"{'streams':>8} {'pass':>4} {'wall s':>8} {'reqs':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}  summary")
+    with FakeCluster(args.hosts, args.dead, args.dead_mode, args.latency, args.jitter,
+                     args.error_rate) as cluster:
+        for size in sizes:
+            with tempfile.TemporaryDirectory(prefix='bench_updater_') as tmp:
+                workdir = Path(tmp)
+                config_path = workdir / 'streams.json'
+                make_config(config_path, size)
+
+                for run in range(1, args.passes + 1):
+                    result = run_once(cluster, config_path, workdir, args)
+                    result.update({'streams': size, 'pass': run})
+                    results.append(result)
+                    print(f"{size:>8} {run:>4} {result['wall_s']:>8.2f} {result['requests']:>7} "
+                          f"{result['p50_s']:>7.3f} {result['p95_s']:>7.3f} {result['p99_s']:>7.3f}  "
+                          f"{result['summary']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Yerel sahte Invidious sunucusu - benchmark'lar için gecikme, hata oranı ve ölü host simülasyonu
+
+Tek başına da çalışır:
+    python benchmarks/fake_invidious.py --hosts 3 --dead 1 --latency 0.05
+"""
+
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHANNEL_PATH = re.compile(r'^/api/v1/channels/([^/]+)$')
+VIDEOS_PATH = re.compile(r'^/api/v1/channels/([^/]+)/videos$')
+VIDEO_PATH = re.compile(r'^/api/v1/videos/([^/?]+)')
+MANIFEST_PATH = re.compile(r'^/api/manifest/hls_variant/id/([^/]+)/')
+
+# YouTube canlı yayın master playlist'i gibi düşükten yükseğe sıralı varyantlar
+VARIANTS = [
+    (290000, '256x144', 'avc1.4d400c'),
+    (546000, '426x240', 'avc1.4d4015'),
+    (1209000, '640x360', 'avc1.4d401e'),
+    (2969000, '1280x720', 'avc1.4d401f'),
+    (5420000, '1920x1080', 'avc1.640028'),
+]
+
+
+class Stats:
+    """İstek sayaçları (thread-safe)"""
+
+    def __init__(self):
+        self.by_kind = Counter()
+        self.by_host = Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, host, kind):
+        with self._lock:
+            self.by_kind[kind] += 1
+            self.by_host[host] += 1
+
+    def reset(self):
+        with self._lock:
+            self.by_kind.clear()
+            self.by_host.clear()
+
+    @property
+    def total(self):
+        return sum(self.by_kind.values())
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, role, stats, latency=0.05, jitter=0.02, error_rate=0.0,
+                 hang=False, manifest_base=None, live_ratio=1.0):
+        super().__init__(('127.0.0.1', 0), FakeHandler)
+        self.role = role
+        self.stats = stats
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang = hang
+        self.manifest_base = manifest_base
+        self.live_ratio = live_ratio
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, content_type='application/json'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        host = server.base_url
+
+        if server.hang:
+            # Bağlantıyı kabul et ama hiç cevap verme (istemci timeout'a düşer)
+            server.stats.hit(host, 'hang')
+            time.sleep(3600)
+            return
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            server.stats.hit(host, 'error')
+            self.send_body(500, '{"error": "Could not extract video info"}')
+            return
+
+        path = self.path
+        if (m := VIDEOS_PATH.match(path)):
+            server.stats.hit(host, 'videos')
+            channel_id = m.group(1)
+            live = random.Random(channel_id).random() < server.live_ratio
+            videos = [{'videoId': f'{channel_id[-8:]}old{i}', 'liveNow': False, 'lengthSeconds': 600}
+                      for i in range(3)]
+            if live:
+                videos.insert(1, {'videoId': f'live{channel_id[-7:]}', 'liveNow': True, 'lengthSeconds': 0})
+            self.send_body(200, json.dumps({'videos': videos}))
+        elif (m := CHANNEL_PATH.match(path)):
+            server.stats.hit(host, 'channels')
+            self.send_body(200, json.dumps({'author': m.group(1), 'authorId': m.group(1)}))
+        elif (m := VIDEO_PATH.match(path)):
+            server.stats.hit(host, 'video')
+            video_id = m.group(1)
+            url = (f"{server.manifest_base}/api/manifest/hls_variant/id/{video_id}/"
+                   f"expire/{int(time.time()) + 21600}/sig/{random.getrandbits(64):x}/file/index.m3u8")
+            self.send_body(200, json.dumps({
+                'videoId': video_id,
+                'liveNow': video_id.startswith('live'),
+                'formatStreams': [],
+                'adaptiveFormats': [{'url': url, 'type': 'application/x-mpegURL'}],
+            }))
+        elif (m := MANIFEST_PATH.match(path)):
+            server.stats.hit(host, 'm3u8')
+            video_id = m.group(1)
+            lines = ['#EXTM3U', '#EXT-X-INDEPENDENT-SEGMENTS']
+            for bandwidth, resolution, codec in VARIANTS:
+                lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},CODECS="{codec},mp4a.40.2",'
+                             f'RESOLUTION={resolution},FRAME-RATE=30')
+                lines.append(f'{server.base_url}/api/manifest/hls_playlist/id/{video_id}/'
+                             f'itag/{bandwidth % 97}/playlist/index.m3u8')
+            self.send_body(200, '\n'.join(lines) + '\n', 'application/vnd.apple.mpegurl')
+        else:
+            server.stats.hit(host, 'other')
+            self.send_body(404, '{"error": "not found"}')
+
+
+class FakeCluster:
+    """N sahte Invidious instance'ı + bir manifest (googlevideo) sunucusu"""
+
+    def __init__(self, hosts=3, dead=0, dead_mode='refuse', latency=0.05, jitter=0.02,
+                 error_rate=0.0, live_ratio=1.0):
+        self.stats = Stats()
+        self.servers = []
+        self.instances = []
+        self._refused = []
+
+        self.manifest_server = FakeServer('manifest', self.stats, latency=latency / 2, jitter=jitter / 2)
+        self.servers.append(self.manifest_server)
+
+        for i in range(hosts):
+            if i < dead and dead_mode == 'refuse':
+                self.instances.append(f"http://127.0.0.1:{self._free_port()}")
+                continue
+            server = FakeServer('invidious', self.stats, latency=latency, jitter=jitter,
+                                error_rate=error_rate, hang=(i < dead),
+                                manifest_base=self.manifest_server.base_url,
+                                live_ratio=live_ratio)
+            self.servers.append(server)
+            self.instances.append(server.base_url)
+
+    @staticmethod
+    def _free_port():
+        # Dinlenmeyen bir port: bağlantı anında reddedilir
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def start(self):
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Invidious cluster')
+    parser.add_argument('--hosts', type=int, default=3, help='Number of Invidious instances')
+    parser.add_argument('--dead', type=int, default=0, help='How many of them are dead')
+    parser.add_argument('--dead-mode', choices=['refuse', 'hang'], default='refuse')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean response latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Latency jitter (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of HTTP 500')
+    args = parser.parse_args()
+
+    cluster = FakeCluster(args.hosts, args.dead, args.dead_mode, args.latency,
+                          args.jitter, args.error_rate).start()
+    print(f"INVIDIOUS_INSTANCES={','.join(cluster.instances)}")
+    print("Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"requests: {dict(cluster.stats.by_kind)}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+worker.js için yerel yedek - sentetik canlı HLS origin + /checklist/ ve /proxy/ uçlarını
+worker.js ile aynı şekilde sunan vekil sunucu (yük testi Cloudflare'a gitmeden koşsun diye)
+
+Tek başına da çalışır:
+    python benchmarks/fake_worker.py --target-duration 2 --segment-kb 300
+"""
+
+import argparse
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+LIVE_PATH = re.compile(r'^/live/([^/?]+?)(?:\.m3u8)?$')
+SEGMENT_PATH = re.compile(r'^/seg/([^/]+)/(\d+)\.ts$')
+# worker.js: text.replace(/(https:\/\/[^ \n]+)/g, ...) - yerelde origin http olduğu için http de dahil
+PLAYLIST_URL = re.compile(r'(https?://[^ \n]+)')
+
+
+class FakeOrigin(ThreadingHTTPServer):
+    """Kayan pencereli canlı media playlist ve sabit boyutlu segmentler sunar"""
+    daemon_threads = True
+
+    def __init__(self, target_duration=2.0, segment_bytes=300 * 1024, window=6, latency=0.0):
+        super().__init__(('127.0.0.1', 0), OriginHandler)
+        self.target_duration = target_duration
+        self.window = window
+        self.latency = latency
+        self.payload = bytes(range(256)) * (segment_bytes // 256) + b'\0' * (segment_bytes % 256)
+        self.started = time.time()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def playlist(self, cid):
+        """Şu anki canlı kenara göre son window segmentlik playlist"""
+        newest = int((time.time() - self.started) / self.target_duration) + self.window
+        first = newest - self.window + 1
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{self.target_duration:g}',
+            f'#EXT-X-MEDIA-SEQUENCE:{first}',
+        ]
+        for n in range(first, newest + 1):
+            lines.append(f'#EXTINF:{self.target_duration:.3f},')
+            lines.append(f'{self.base_url}/seg/{cid}/{n}.ts')
+        return '\n'.join(lines) + '\n'
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        live = LIVE_PATH.match(self.path)
+        if live:
+            body = self.server.playlist(live.group(1)).encode('utf-8')
+            return self.send_body(200, body, 'application/vnd.apple.mpegurl')
+        if SEGMENT_PATH.match(self.path):
+            return self.send_body(200, self.server.payload, 'video/mp2t')
+        self.send_body(404, b'not found', 'text/plain')
+
+
+class StandInWorker(ThreadingHTTPServer):
+    """worker.js'in /checklist/ ve /proxy/ davranışını taklit eden vekil"""
+    daemon_threads = True
+
+    def __init__(self, base_url):
+        super().__init__(('127.0.0.1', 0), WorkerHandler)
+        self.playlist_base = base_url
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        try:
+            if self.path.startswith('/proxy/'):
+                target = unquote(self.path[len('/proxy/'):])
+                with urllib.request.urlopen(target, timeout=10) as res:
+                    body = res.read()
+                    content_type = res.headers.get('Content-Type', 'application/octet-stream')
+                return self.send_body(200, body, content_type)
+
+            if self.path.startswith('/checklist/'):
+                cid = self.path.split('/checklist/', 1)[1]
+                with urllib.request.urlopen(f"{self.server.playlist_base}{cid}", timeout=10) as res:
+                    text = res.read().decode('utf-8')
+                text = PLAYLIST_URL.sub(lambda m: f"/proxy/{quote(m.group(1), safe='')}", text)
+                return self.send_body(200, text.encode('utf-8'), 'application/vnd.apple.mpegurl')
+        except (urllib.error.URLError, OSError) as e:
+            return self.send_body(502, f"Proxy Error: {e}".encode('utf-8'), 'text/plain')
+
+        self.send_body(200, 'Cloudflare Worker aktif 🚀'.encode('utf-8'), 'text/plain')
+
+
+class LocalWorker:
+    """Origin + vekil worker'ı arka planda çalıştırır"""
+
+    def __init__(self, target_duration=2.0, segment_bytes=300 * 1024, window=6, latency=0.0):
+        self.origin = FakeOrigin(target_duration, segment_bytes, window, latency)
+        self.worker = StandInWorker(self.origin.base_url + '/live/')
+        self._threads = []
+
+    @property
+    def url(self):
+        return self.worker.base_url
+
+    def start(self):
+        for server in (self.origin, self.worker):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        for server in (self.worker, self.origin):
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for worker.js with a synthetic HLS origin')
+    parser.add_argument('--target-duration', type=float, default=2.0, help='Segment duration (s)')
+    parser.add_argument('--segment-kb', type=int, default=300, help='Segment size (KB)')
+    parser.add_argument('--window', type=int, default=6, help='Segments per live playlist')
+    parser.add_argument('--latency', type=float, default=0.0, help='Origin latency per request (s)')
+    args = parser.parse_args()
+
+    with LocalWorker(args.target_duration, args.segment_kb * 1024, args.window, args.latency) as local:
+        print(f"Worker: {local.url}/checklist/androstreamlivebs1.m3u8")
+        print(f"Origin: {local.origin.base_url}/live/androstreamlivebs1.m3u8")
+        print("Ctrl+C ile durdur.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
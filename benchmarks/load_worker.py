@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+worker.js yük testi - sanal izleyiciler playlist'i hedef segment süresinde yoklar ve
+yeni segmentleri /proxy/ üzerinden çeker; gecikme yüzdelikleri, throughput ve hata oranı raporlanır
+
+Kullanım:
+    python benchmarks/load_worker.py --local --viewers 50 --duration 60
+    WORKER_URL=https://macyayin.example.workers.dev python benchmarks/load_worker.py --viewers 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urljoin
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_worker import LocalWorker  # noqa: E402
+from run_metrics import percentile  # noqa: E402
+
+# Oynatıcı gibi: ilk yüklemede canlı kenardaki son N segmentle başla
+START_SEGMENTS = 3
+
+
+class Recorder:
+    """İstek türüne göre gecikme, bayt ve hata sayaçları (thread-safe)"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def ok(self, kind, elapsed, size):
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(elapsed)
+            self.bytes += size
+
+    def error(self, kind, reason):
+        with self._lock:
+            self.errors[(kind, reason)] += 1
+
+    def report(self, wall):
+        kinds = sorted(set(self.latencies) | {kind for kind, _ in self.errors})
+        result = {'wall_s': round(wall, 2), 'bytes': self.bytes,
+                  'throughput_mbps': round(self.bytes * 8 / wall / 1e6, 2) if wall else 0.0, 'kinds': {}}
+        for kind in kinds:
+            values = self.latencies.get(kind, [])
+            errors = sum(count for (k, _), count in self.errors.items() if k == kind)
+            total = len(values) + errors
+            result['kinds'][kind] = {
+                'requests': total,
+                'errors': errors,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'rps': round(total / wall, 2) if wall else 0.0,
+                'p50_s': round(percentile(values, 50), 4),
+                'p95_s': round(percentile(values, 95), 4),
+                'p99_s': round(percentile(values, 99), 4),
+            }
+        result['error_reasons'] = {f"{kind}:{reason}": count for (kind, reason), count in self.errors.items()}
+        return result
+
+
+def parse_playlist(text, playlist_url):
+    """(hedef süre, [segment/varyant adresi], master mı)"""
+    target = None
+    uris = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            target = float(line.split(':', 1)[1])
+        elif line and not line.startswith('#'):
+            uris.append(urljoin(playlist_url, line))
+    return target, uris, '#EXT-X-STREAM-INF' in text
+
+
+def fetch(session, recorder, kind, url, timeout):
+    """İsteği yap, gövdeyi sonuna kadar oku; başarılıysa gövdeyi döndür"""
+    start = time.perf_counter()
+    try:
+        r = session.get(url, timeout=timeout)
+        body = r.content
+    except requests.RequestException as e:
+        recorder.error(kind, type(e).__name__)
+        return None
+    if r.status_code != 200:
+        recorder.error(kind, str(r.status_code))
+        return None
+    recorder.ok(kind, time.perf_counter() - start, len(body))
+    return body
+
+
+def viewer(playlist_url, deadline, recorder, timeout, default_target):
+    """Tek izleyici: playlist'i hedef süre aralığıyla yokla, yeni segmentleri indir"""
+    session = requests.Session()
+    seen = set()
+    first = True
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        body = fetch(session, recorder, 'playlist', playlist_url, timeout)
+        target = default_target
+        if body is not None:
+            text = body.decode('utf-8', 'replace')
+            target, uris, master = parse_playlist(text, playlist_url)
+            target = target or default_target
+            if master and uris:
+                # Master playlist: ilk (en yüksek) varyantı izle
+                playlist_url = uris[0]
+                continue
+            new = [u for u in uris if u not in seen]
+            if first:
+                new = new[-START_SEGMENTS:]
+                first = False
+            for uri in new:
+                if time.monotonic() >= deadline:
+                    break
+                seen.add(uri)
+                fetch(session, recorder, 'segment', uri, timeout)
+        time.sleep(max(0.0, target - (time.monotonic() - started)))
+
+
+def run(worker_url, channel, viewers, duration, ramp, timeout, default_target):
+    recorder = Recorder()
+    playlist_url = f"{worker_url.rstrip('/')}/checklist/{channel}"
+    start = time.monotonic()
+    deadline = start + duration
+    threads = []
+    for n in range(viewers):
+        thread = threading.Thread(target=viewer, daemon=True,
+                                  args=(playlist_url, deadline, recorder, timeout, default_target))
+        thread.start()
+        threads.append(thread)
+        # İzleyicileri ramp süresine yay (hepsi aynı anda bağlanmasın)
+        if ramp and viewers > 1:
+            time.sleep(ramp / viewers)
+    for thread in threads:
+        thread.join(timeout=max(0.0, deadline - time.monotonic()) + timeout + 1)
+    return recorder.report(time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test for worker.js /checklist/ and /proxy/')
+    parser.add_argument('--url', default=os.getenv('WORKER_URL'), help='Worker URL (default: $WORKER_URL)')
+    parser.add_argument('--local', action='store_true', help='Use the local stand-in worker + synthetic origin')
+    parser.add_argument('--channel', default='androstreamlivebs1.m3u8', help='Channel playlist name')
+    parser.add_argument('--viewers', type=int, default=20, help='Concurrent virtual viewers')
+    parser.add_argument('--duration', type=float, default=60, help='Test duration (s)')
+    parser.add_argument('--ramp', type=float, default=5, help='Spread viewer start over this many seconds')
+    parser.add_argument('--timeout', type=float, default=10, help='Per-request timeout (s)')
+    parser.add_argument('--target-duration', type=float, default=2.0,
+                        help='Poll interval when the playlist has no target duration; local segment length')
+    parser.add_argument('--segment-kb', type=int, default=300, help='Local synthetic segment size (KB)')
+    parser.add_argument('--origin-latency', type=float, default=0.0, help='Local origin latency (s)')
+    parser.add_argument('--json', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    if not args.local and not args.url:
+        parser.error('--url / WORKER_URL or --local is required')
+
+    print(f"{args.viewers} izleyici, {args.duration:g}s, kanal {args.channel}"
+          f"{' (yerel yedek)' if args.local else ''}")
+    if args.local:
+        with LocalWorker(args.target_duration, args.segment_kb * 1024, latency=args.origin_latency) as local:
+            result = run(local.url, args.channel, args.viewers, args.duration, args.ramp,
+                         args.timeout, args.target_duration)
+    else:
+        result = run(args.url, args.channel, args.viewers, args.duration, args.ramp,
+                     args.timeout, args.target_duration)
+
+    print(f"{'kind':9} {'reqs':>7} {'err %':>6} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}")
+    for kind, stats in result['kinds'].items():
+        print(f"{kind:9} {stats['requests']:>7} {stats['error_rate'] * 100:>6.2f} {stats['rps']:>7.2f} "
+              f"{stats['p50_s']:>7.3f} {stats['p95_s']:>7.3f} {stats['p99_s']:>7.3f}")
+    print(f"Throughput: {result['throughput_mbps']:.2f} Mbit/s ({result['bytes'] / 1024 / 1024:.1f} MB)")
+    for reason, count in sorted(result['error_reasons'].items()):
+        print(f"  {reason}: {count}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'result': result}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,430 @@
+import argparse
+import os
+import queue
+import threading
 import time
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+import requests
 import undetected_chromedriver as uc
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 
-def main():
+from episode_cache import EpisodeCache
+from http_client import HttpClient
+
+OUTPUT_FILE = "canlidizi_listesi.m3u"
+# Bölüm keşfi için başlangıç linkleri; dizi sayfası (BOT_SERIES_URL) verilirse oradan da taranır
+SEED_LINKS = [
+    "https://www.canlidizi14.com/kismetse-olur-askin-gucu-58-bolum-izle.html",
+    "https://www.canlidizi14.com/kismetse-olur-askin-gucu-57-bolum-izle.html",
+    "https://www.canlidizi14.com/kismetse-olur-askin-gucu-56-bolum-izle.html",
+    "https://www.canlidizi14.com/kismetse-olur-askin-gucu-55-bolum-izle.html"
+]
+SERIES_URL = os.getenv("BOT_SERIES_URL", "")
+MAX_DISCOVERY_PAGES = 5
+EPISODE_SLUG = re.compile(r'^(.+)-(\d+)-bolum-izle\.html$')
+HREF_PATTERN = re.compile(r'href=["\']([^"\'#]+)', re.IGNORECASE)
+# Çözülmüş bölüm -> m3u8 önbelleği (boşsa kullanılmaz)
+CACHE_FILE = os.getenv("BOT_CACHE_FILE", "canlidizi_cache.json")
+# Aynı anda açık tarayıcı sayısı ve bir tarayıcının kaç sayfadan sonra yeniden başlatılacağı
+WORKERS = int(os.getenv("BOT_WORKERS", "2"))
+RECYCLE_AFTER = int(os.getenv("BOT_RECYCLE_AFTER", "20"))
+# Sayfa başına m3u8 isteği için en uzun bekleme ve log yoklama aralığı (sn)
+PAGE_WAIT = float(os.getenv("BOT_DEADLINE", "15"))
+POLL_INTERVAL = 0.25
+
+M3U8_PATTERN = re.compile(r'https?://video\.twimg\.com/[^"\']+\.m3u8[^"\']*')
+
+# Tarayıcıdan önce denenen düz HTTP katmanı: sayfa + gömülü iframe / oynatıcı JSON'ları
+HTTP_WORKERS = int(os.getenv("BOT_HTTP_WORKERS", "8"))
+HTTP_TIMEOUT = 10
+MAX_EMBEDS = 6
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+IFRAME_PATTERN = re.compile(r'<iframe[^>]+?src=["\']([^"\']+)["\']', re.IGNORECASE)
+# Oynatıcı yapılandırması döndürebilecek adresler (ör. "/player/api.json?id=..", "embed.php?v=..")
+PLAYER_PATTERN = re.compile(r'["\']((?:https?:)?[^"\'\s<>]*(?:\.json|/embed/|/player/|embed\.php|player\.php)[^"\'\s<>]*)["\']',
+                            re.IGNORECASE)
+
+# uc.Chrome ilk açılışta chromedriver dosyasını yamalıyor; aynı anda iki başlatma çakışmasın
+_driver_start_lock = threading.Lock()
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def make_options():
     # 1. PERFORMANS LOGLARINI AKTİF ET (Hatanın çözümü burası)
     options = uc.ChromeOptions()
     options.add_argument("--headless")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
+
     # Loglama yetkisini tanımlıyoruz
     options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def make_session(pool_size=HTTP_WORKERS):
+    # Sayfalar tekrar denenebilir; başarısızsa zaten tarayıcı katmanına düşülüyor, o yüzden tek tekrar
+    return HttpClient(pool_size=pool_size, timeout=HTTP_TIMEOUT, retries=1,
+                      headers={"User-Agent": USER_AGENT})
+
+
+def start_driver():
+    with _driver_start_lock:
+        return uc.Chrome(options=make_options())
+
+
+def episode_number(url, prefixes):
+    """Link bilinen bir dizinin bölümüyse bölüm numarası, değilse None"""
+    head, _, slug = url.rpartition('/')
+    match = EPISODE_SLUG.match(slug)
+    if match and f"{head}/{match.group(1)}" in prefixes:
+        return int(match.group(2))
+    return None
+
+
+def discover_episodes(session, seeds, series_url=""):
+    """Dizi sayfasını ve en yeni bölümü tarayıp bölüm linklerini bul (yeniden eskiye)"""
+    prefixes = set()
+    episodes = {}
+    for url in seeds:
+        head, _, slug = url.rpartition('/')
+        match = EPISODE_SLUG.match(slug)
+        if match:
+            prefixes.add(f"{head}/{match.group(1)}")
+            episodes[url] = int(match.group(2))
+
+    to_crawl = [series_url] if series_url else []
+    if episodes:
+        to_crawl.append(max(episodes, key=episodes.get))
+    crawled = set()
+
+    while to_crawl and len(crawled) < MAX_DISCOVERY_PAGES:
+        page = to_crawl.pop(0)
+        if page in crawled:
+            continue
+        crawled.add(page)
+        try:
+            r = session.get(page, timeout=HTTP_TIMEOUT)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            log(f"[keşif] {page}: {type(e).__name__}")
+            # Henüz yayınlanmamış bölüme verilen "sonraki bölüm" linki listeye girmesin
+            if e.response is not None and e.response.status_code in (404, 410) and page not in seeds:
+                episodes.pop(page, None)
+            continue
+        for href in HREF_PATTERN.findall(r.text):
+            url = urljoin(page, href)
+            number = episode_number(url, prefixes)
+            if number is not None:
+                episodes.setdefault(url, number)
+        # Yeni çıkan bölümler en yeni bölüm sayfasında listelenir; oraya kadar ilerle
+        newest = max(episodes, key=episodes.get) if episodes else None
+        if newest and newest not in crawled:
+            to_crawl.append(newest)
+
+    return sorted(episodes, key=lambda url: -episodes[url])
+
+
+def episode_name(url):
+    slug = url.split('/')[-1]
+    return slug.replace(".html", "").replace("-", " ").upper()
+
+
+def is_stream_request(u):
+    return "video.twimg.com" in u and ".m3u8" in u
+
+
+def read_network_log(driver):
+    """Performans log tamponunu oku (okuma tamponu boşaltır), istek URL'lerini döndür"""
+    urls = []
+    for entry in driver.get_log("performance"):
+        try:
+            log_entry = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if log_entry.get("method") == "Network.requestWillBeSent":
+            urls.append(log_entry["params"]["request"]["url"])
+    return urls
+
+
+def find_m3u8(text):
+    """Metinde video.twimg.com m3u8 adresi ara (JSON içindeki \\/ kaçışları dahil)"""
+    match = M3U8_PATTERN.search(text) or M3U8_PATTERN.search(text.replace("\\/", "/"))
+    if match:
+        return match.group(0).replace("\\/", "/")
+    return None
+
+
+def find_in_source(driver):
+    return find_m3u8(driver.page_source)
+
 
-    print("Tarayıcı başlatılıyor...")
-    driver = uc.Chrome(options=options)
-    
-    links = [
-        "https://www.canlidizi14.com/kismetse-olur-askin-gucu-58-bolum-izle.html",
-        "https://www.canlidizi14.com/kismetse-olur-askin-gucu-57-bolum-izle.html",
-        "https://www.canlidizi14.com/kismetse-olur-askin-gucu-56-bolum-izle.html",
-        "https://www.canlidizi14.com/kismetse-olur-askin-gucu-55-bolum-izle.html"
-    ]
+def embedded_urls(html, base_url):
+    """Sayfadaki iframe ve oynatıcı JSON adresleri (sırasıyla, tekrarsız)"""
+    found = []
+    for pattern in (IFRAME_PATTERN, PLAYER_PATTERN):
+        for raw in pattern.findall(html):
+            u = urljoin(base_url, raw.replace("\\/", "/").replace("&amp;", "&"))
+            if urlparse(u).scheme in ("http", "https") and u != base_url and u not in found:
+                found.append(u)
+    return found[:MAX_EMBEDS]
 
+
+def resolve_with_http(session, url):
+    """Tarayıcısız deneme: sayfayı ve gömülü iframe/oynatıcı kaynaklarını indirip m3u8 ara"""
+    r = session.get(url, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    video_url = find_m3u8(r.text)
+    if video_url:
+        return video_url
+
+    for embed in embedded_urls(r.text, url):
+        try:
+            er = session.get(embed, timeout=HTTP_TIMEOUT, headers={"Referer": url})
+        except requests.RequestException:
+            continue
+        if er.ok:
+            video_url = find_m3u8(er.text)
+            if video_url:
+                return video_url
+    return None
+
+
+def resolve_with_driver(driver, url, deadline=PAGE_WAIT, poll=POLL_INTERVAL):
+    """Sayfayı tarayıcıda aç, m3u8 isteği görülene kadar (en fazla deadline sn) bekle
+
+    (m3u8 adresi, bulma süresi) döndürür; bulunamazsa adres None.
+    """
+    # Önceki sayfadan kalan logları at ki bu sayfanın taraması küçük kalsın
+    try:
+        read_network_log(driver)
+    except Exception:
+        pass
+
+    start = time.monotonic()
+    driver.get(url)
+    checked_source = False
+
+    while True:
+        # Yöntem A: Network Loglarını Tara (gelen olaylar geldikçe)
+        try:
+            for u in read_network_log(driver):
+                if is_stream_request(u):
+                    return u, time.monotonic() - start
+        except Exception as log_err:
+            log(f"  (Log okuma hatası: {log_err})")
+
+        # Yöntem B: Sayfa Kaynağında Ara (Regex) - yüklemeden hemen sonra bir kez, süre dolunca bir kez
+        expired = time.monotonic() - start >= deadline
+        if not checked_source or expired:
+            checked_source = True
+            video_url = find_in_source(driver)
+            if video_url:
+                return video_url, time.monotonic() - start
+        if expired:
+            return None, time.monotonic() - start
+        time.sleep(poll)
+
+
+class OrderedWriter:
+    """Sonuçları bitiş sırasından bağımsız olarak link sırasıyla dosyaya yazar"""
+
+    def __init__(self, f):
+        self.f = f
+        self.pending = {}
+        self.next_index = 0
+        self.lock = threading.Lock()
+
+    def put(self, index, name, video_url):
+        with self.lock:
+            self.pending[index] = (name, video_url)
+            # Sıradaki sonuç geldikçe ardışık olanları hemen yaz
+            while self.next_index in self.pending:
+                name, video_url = self.pending.pop(self.next_index)
+                if video_url:
+                    self.f.write(f"#EXTINF:-1, {name}\n{video_url}\n")
+                    self.f.flush()
+                self.next_index += 1
+
+    def flush(self):
+        """Sırada boşluk kalmış olsa da bekleyen sonuçların hepsini link sırasıyla yaz"""
+        with self.lock:
+            for index in sorted(self.pending):
+                name, video_url = self.pending[index]
+                if video_url:
+                    self.f.write(f"#EXTINF:-1, {name}\n{video_url}\n")
+            self.f.flush()
+            self.pending.clear()
+
+
+def browser_worker(worker_id, jobs, writer, recycle_after, stats, deadline=PAGE_WAIT, cache=None):
+    """Kuyruktan link al, kendi tarayıcısıyla çöz; recycle_after sayfada bir tarayıcıyı yenile"""
+    driver = None
+    pages = 0
+    try:
+        while True:
+            try:
+                index, url = jobs.get_nowait()
+            except queue.Empty:
+                return
+
+            slug = url.split('/')[-1]
+            video_url = None
+            try:
+                if driver is not None and recycle_after and pages >= recycle_after:
+                    log(f"[{worker_id}] {pages} sayfa sonrası tarayıcı yeniden başlatılıyor...")
+                    try:
+                        driver.quit()
+                    except Exception as e:
+                        log(f"[{worker_id}] Tarayıcı kapatılamadı: {e}")
+                    driver = None
+                if driver is None:
+                    driver = start_driver()
+                    pages = 0
+                video_url, elapsed = resolve_with_driver(driver, url, deadline)
+                if video_url:
+                    with stats["lock"]:
+                        stats["detect"].append(elapsed)
+                    if cache is not None:
+                        cache.put(url, video_url)
+                    log(f"[{worker_id}] {slug}: BULDUM! ({elapsed:.1f}s)")
+                else:
+                    log(f"[{worker_id}] {slug}: BAŞARISIZ ({elapsed:.1f}s, Başlık: {driver.title})")
+            except Exception as e:
+                log(f"[{worker_id}] {slug}: HATA: {e}")
+                # Çökmüş tarayıcıyla devam etme, sonraki sayfada yenisi açılsın
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = None
+            finally:
+                pages += 1
+                with stats["lock"]:
+                    stats["browser" if video_url else "failed"] += 1
+                writer.put(index, episode_name(url), video_url)
+    finally:
+        if driver is not None:
+            driver.quit()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="canlidizi bölümlerinden m3u8 listesi çıkar")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"Aynı anda çalışan tarayıcı sayısı (varsayılan: {WORKERS})")
+    parser.add_argument("--recycle", type=int, default=RECYCLE_AFTER,
+                        help=f"Tarayıcıyı bu kadar sayfadan sonra yeniden başlat, 0 = hiç (varsayılan: {RECYCLE_AFTER})")
+    parser.add_argument("--deadline", type=float, default=PAGE_WAIT,
+                        help=f"Sayfa başına m3u8 bekleme süresi sn (varsayılan: {PAGE_WAIT:g})")
+    parser.add_argument("--http-workers", type=int, default=HTTP_WORKERS,
+                        help=f"HTTP katmanında eşzamanlı istek sayısı, 0 = katmanı atla (varsayılan: {HTTP_WORKERS})")
+    parser.add_argument("--series", default=SERIES_URL,
+                        help="Bölüm linklerinin taranacağı dizi sayfası (varsayılan: BOT_SERIES_URL)")
+    parser.add_argument("--cache", default=CACHE_FILE,
+                        help=f"Çözülmüş bölüm önbelleği, boş = kapalı (varsayılan: {CACHE_FILE})")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"Çıktı dosyası (varsayılan: {OUTPUT_FILE})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    session = make_session(max(1, args.http_workers))
+    links = discover_episodes(session, SEED_LINKS, args.series)
     print(f"Toplam {len(links)} link işleniyor...")
 
+    cache = EpisodeCache()
+    if args.cache:
+        cache.load(args.cache)
+    stats = {"cache": 0, "http": 0, "browser": 0, "failed": 0, "detect": [], "lock": threading.Lock()}
+    start = time.monotonic()
+
     try:
-        with open("canlidizi_listesi.m3u", "w", encoding="utf-8") as f:
+        with open(args.output, "w", encoding="utf-8") as f:
             f.write("#EXTM3U\n")
-            
-            for url in links:
-                slug = url.split('/')[-1]
-                print(f"Açılıyor: {slug}...", end=" ", flush=True)
-                
-                try:
-                    driver.get(url)
-                    time.sleep(15) # Video ve JS yüklenmesi için kritik bekleme
-                    
-                    video_url = None
+            writer = OrderedWriter(f)
+
+            # 0. katman: süresi dolmamış önbellek kayıtları
+            pending = []
+            for index, url in enumerate(links):
+                video_url = cache.get(url)
+                if video_url:
+                    stats["cache"] += 1
+                    writer.put(index, episode_name(url), video_url)
+                else:
+                    pending.append((index, url))
 
-                    # Yöntem A: Network Loglarını Tara
+            # 1. katman: düz HTTP (tarayıcı açmadan)
+            if pending and args.http_workers > 0:
+                def try_http(item):
+                    index, url = item
                     try:
-                        logs = driver.get_log("performance")
-                        for entry in logs:
-                            log = json.loads(entry["message"])["message"]
-                            if "Network.requestWillBeSent" in log["method"]:
-                                u = log["params"]["request"]["url"]
-                                if "video.twimg.com" in u and ".m3u8" in u:
-                                    video_url = u
-                                    break
-                    except Exception as log_err:
-                        print(f"(Log okuma hatası: {log_err})", end=" ")
-
-                    # Yöntem B: Loglarda yoksa Sayfa Kaynağında Ara (Regex)
-                    if not video_url:
-                        source = driver.page_source
-                        match = re.search(r'https?://video\.twimg\.com/[^"\']+\.m3u8[^"\']*', source)
-                        if match:
-                            video_url = match.group(0).replace("\\/", "/")
+                        return resolve_with_http(session, url)
+                    except requests.RequestException as e:
+                        log(f"[http] {url.split('/')[-1]}: {type(e).__name__}, tarayıcıya bırakıldı")
+                        return None
 
+                with ThreadPoolExecutor(max_workers=args.http_workers) as pool:
+                    http_results = list(pool.map(try_http, pending))
+                unresolved = []
+                for (index, url), video_url in zip(pending, http_results):
                     if video_url:
-                        name = slug.replace(".html", "").replace("-", " ").upper()
-                        f.write(f"#EXTINF:-1, {name}\n{video_url}\n")
-                        f.flush()
-                        print("BULDUM!")
+                        log(f"[http] {url.split('/')[-1]}: BULDUM!")
+                        stats["http"] += 1
+                        cache.put(url, video_url)
+                        writer.put(index, episode_name(url), video_url)
                     else:
-                        title = driver.title
-                        print(f"BAŞARISIZ (Başlık: {title})")
-                
-                except Exception as e:
-                    print(f"HATA: {e}")
-                    
+                        unresolved.append((index, url))
+                pending = unresolved
+
+            # 2. katman: tarayıcı havuzu - sadece HTTP ile çözülemeyen linkler için açılır
+            if not pending:
+                return
+            workers = max(1, min(args.workers, len(pending)))
+            print(f"{len(pending)} link {workers} tarayıcı ile işleniyor...")
+            jobs = queue.Queue()
+            for item in pending:
+                jobs.put(item)
+            threads = [
+                threading.Thread(target=browser_worker, name=f"w{n}",
+                                 args=(f"w{n}", jobs, writer, args.recycle, stats, args.deadline, cache))
+                for n in range(1, workers + 1)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # Çöken bir worker'ın kuyrukta bıraktığı linkler başarısız sayılır
+            while True:
+                try:
+                    index, url = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                with stats["lock"]:
+                    stats["failed"] += 1
+                writer.put(index, episode_name(url), None)
+            # Sırada boşluk kalsa bile bulunan sonuçlar dosyaya yazılsın
+            writer.flush()
     finally:
-        driver.quit()
-        print("İşlem tamamlandı.")
+        if args.cache:
+            cache.save(args.cache)
+        found = stats['cache'] + stats['http'] + stats['browser']
+        print(f"İşlem tamamlandı: {found} bulundu (önbellek: {stats['cache']}, "
+              f"HTTP: {stats['http']}, tarayıcı: {stats['browser']}), {stats['failed']} başarısız "
+              f"({time.monotonic() - start:.1f}s).")
+        detect = sorted(stats["detect"])
+        if detect:
+            print(f"Bulma süresi: ortalama {sum(detect) / len(detect):.1f}s, "
+                  f"medyan {detect[len(detect) // 2]:.1f}s, en uzun {detect[-1]:.1f}s")
 
 if __name__ == "__main__":
     main()
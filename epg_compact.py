@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+EPG sıkıştırma - zaman penceresi dışındaki ve tekrarlanan/çakışan programları ayıklar,
+gzip kopyası ve kanal başına JSON parçaları üretir
+"""
+
+import functools
+import gzip
+import json
+import os
+import re
+import shutil
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+
+# XMLTV zaman biçimi: 20260101120000 +0300 (saniye ve offset isteğe bağlı)
+_XMLTV_TIME = re.compile(r'^(\d{12})(\d{2})?\s*([+-]\d{4})?')
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_xmltv_time(value):
+    """XMLTV zamanını timezone'lu datetime'a çevir (okunamazsa None)"""
+    if not value:
+        return None
+    m = _XMLTV_TIME.match(value.strip())
+    if not m:
+        return None
+    stamp = m.group(1) + (m.group(2) or "00")
+    offset = m.group(3) or "+0000"
+    try:
+        naive = datetime.strptime(stamp, "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+    sign = 1 if offset[0] == "+" else -1
+    delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+    return naive.replace(tzinfo=timezone(sign * delta))
+
+
+class ProgrammeWindow:
+    """Programları zaman penceresine göre süzer, tekrar ve çakışmaları atar
+
+    Akış içinde tek geçişte çalışır: kanal başına sadece son kabul edilen
+    programın başlangıç/bitişi ve görülen başlangıç zamanları tutulur.
+    """
+
+    def __init__(self, past_hours=None, future_hours=None, now=None):
+        now = now or datetime.now(timezone.utc)
+        self.not_before = now - timedelta(hours=past_hours) if past_hours is not None else None
+        self.not_after = now + timedelta(hours=future_hours) if future_hours is not None else None
+        self.last = {}
+        self.seen = {}
+        self.dropped = {"window": 0, "duplicate": 0, "overlap": 0}
+
+    def keep(self, programme):
+        """Program yayınlanacak mı"""
+        channel = programme.get("channel")
+        start_raw = programme.get("start")
+        start = parse_xmltv_time(start_raw)
+        stop = parse_xmltv_time(programme.get("stop"))
+
+        if start is None:
+            return True
+
+        if self.not_before and (stop or start) < self.not_before:
+            self.dropped["window"] += 1
+            return False
+        if self.not_after and start > self.not_after:
+            self.dropped["window"] += 1
+            return False
+
+        seen = self.seen.setdefault(channel, set())
+        if start_raw in seen:
+            self.dropped["duplicate"] += 1
+            return False
+
+        last = self.last.get(channel)
+        if last and stop and last[0] <= start < last[1]:
+            self.dropped["overlap"] += 1
+            return False
+
+        seen.add(start_raw)
+        if last is None or start >= last[0]:
+            self.last[channel] = (start, stop or start)
+        return True
+
+
+def write_gzip(path, gz_path=None):
+    """Dosyanın gzip kopyasını yaz (mtime=0: aynı içerik aynı bayt)"""
+    gz_path = gz_path or path + ".gz"
+    tmp_path = gz_path + ".tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(filename=os.path.basename(path), mode="wb", fileobj=raw, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, gz_path)
+    return gz_path
+
+
+def load_channel_ids(id_file):
+    """kanalid.txt ('Ad => id' satırları) -> {id: ad}"""
+    names = {}
+    try:
+        with open(id_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if "=>" in line:
+                    name, ch_id = line.rsplit("=>", 1)
+                    names.setdefault(ch_id.strip(), name.strip())
+    except OSError:
+        pass
+    return names
+
+
+def shard_file_name(ch_id):
+    return re.sub(r"[^a-z0-9._-]", "_", ch_id.lower()) + ".json"
+
+
+def build_shards(xml_path, id_file, out_dir):
+    """Kanal başına JSON parçaları + index.json yaz, yazılan kanal sayısını döndür"""
+    names = load_channel_ids(id_file)
+    programmes = {}
+
+    for _, elem in ET.iterparse(xml_path, events=("end",)):
+        if elem.tag != "programme":
+            continue
+        entry = {"start": elem.get("start"), "stop": elem.get("stop")}
+        for field in ("title", "sub-title", "desc", "category"):
+            child = elem.find(field)
+            if child is not None and child.text:
+                entry[field] = child.text.strip()
+        programmes.setdefault(elem.get("channel"), []).append(entry)
+        elem.clear()
+
+    os.makedirs(out_dir, exist_ok=True)
+    index = {}
+    for ch_id, name in sorted(names.items()):
+        items = programmes.get(ch_id, [])
+        file_name = shard_file_name(ch_id)
+        data = {"id": ch_id, "name": name, "programmes": items}
+        with open(os.path.join(out_dir, file_name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        index[ch_id] = {"name": name, "file": file_name, "programmes": len(items)}
+
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    # Artık rehberde olmayan kanalların eski parçalarını sil
+    written = {entry["file"] for entry in index.values()} | {"index.json"}
+    for file_name in os.listdir(out_dir):
+        if file_name.endswith(".json") and file_name not in written:
+            os.remove(os.path.join(out_dir, file_name))
+
+    return len(index)
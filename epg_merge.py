@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Çok kaynaklı EPG birleştirme - display-name -> kanonik id alias indeksi,
+çakışma tespiti ve önceliğe göre program birleştirme
+"""
+
+from bisect import bisect_right
+
+from epg_compact import parse_xmltv_time
+
+# Türkçe karakter düzeltme haritası
+turkish_map = str.maketrans(
+    "ÇŞĞÜİÖçşıüö",
+    "csguiocsiuo"
+)
+
+
+def make_channel_id(name):
+    """Kanal adından id üret (küçük harf, Türkçe karakterler, boşluk/hd/.tr atılır)"""
+    ch_id = name.lower().translate(turkish_map).replace(" ", "")
+    return ch_id.replace("hd", "").replace(".tr", "")
+
+
+def display_names(channel):
+    """<channel> içindeki boş olmayan display-name metinleri (sırasıyla)"""
+    return [e.text.strip() for e in channel.findall("display-name") if e.text and e.text.strip()]
+
+
+class ChannelIndex:
+    """Kaynakların kanal id'lerini ortak kanonik id'lere eşler
+
+    Farklı kaynaklarda aynı adı (alias) taşıyan kanallar aynı kanonik id'yi alır.
+    Aynı kaynakta iki ayrı kanal aynı id'ye düşerse bu bir çakışmadır: ikinciye
+    '-2', '-3'... eki verilir ve çakışma kaydedilir.
+    """
+
+    def __init__(self):
+        self.aliases = {}
+        self.names = {}
+        self.source_maps = {}
+        self.owners = {}
+        self.collisions = []
+
+    def register(self, source, source_id, names):
+        """Kaynaktaki bir kanalı kaydet, kanonik id'yi döndür"""
+        source_map = self.source_maps.setdefault(source, {})
+        if source_id in source_map:
+            return source_map[source_id]
+
+        aliases = [make_channel_id(name) for name in names]
+        canonical = next((self.aliases[a] for a in aliases if a in self.aliases), None)
+        if canonical is None:
+            canonical = aliases[0] if aliases else source_id
+
+        owner = self.owners.get((source, canonical))
+        if owner is not None and owner != source_id:
+            base = canonical
+            suffix = 2
+            while (source, f"{base}-{suffix}") in self.owners or f"{base}-{suffix}" in self.names:
+                suffix += 1
+            canonical = f"{base}-{suffix}"
+            self.collisions.append({
+                "source": source,
+                "id": base,
+                "channels": [owner, source_id],
+                "names": names,
+                "assigned": canonical,
+            })
+        else:
+            for alias in aliases:
+                self.aliases.setdefault(alias, canonical)
+
+        self.owners[(source, canonical)] = source_id
+        self.names.setdefault(canonical, names[0] if names else canonical)
+        source_map[source_id] = canonical
+        return canonical
+
+    def resolve(self, source, source_id):
+        """Programdaki kanal referansını kanonik id'ye çevir (bilinmiyorsa aynen)"""
+        return self.source_maps.get(source, {}).get(source_id, source_id)
+
+
+def _interval(programme):
+    start = parse_xmltv_time(programme.get("start"))
+    stop = parse_xmltv_time(programme.get("stop")) or start
+    return start, stop
+
+
+def _overlaps(starts, stops, start, stop):
+    """Sıralı [starts, stops] aralık listesinde (start, stop) ile kesişen var mı - O(log n)"""
+    i = bisect_right(starts, start)
+    if i > 0 and stops[i - 1] > start:
+        return True
+    return i < len(starts) and starts[i] < stop
+
+
+def merge_programmes(per_source):
+    """Öncelik sırasındaki kaynakların programlarını kanal bazında birleştir
+
+    per_source: [{kanonik_id: [programme, ...]}, ...] (yüksek öncelik önce).
+    Yüksek öncelikli kaynağın programları aynen alınır; düşük öncelikli kaynaklar
+    sadece boş kalan aralıkları doldurur. Sonuç {kanonik_id: [programme, ...]}
+    başlangıca göre sıralıdır.
+    """
+    merged = {}
+    for programmes_by_channel in per_source:
+        for ch_id, programmes in programmes_by_channel.items():
+            timed = []
+            untimed = []
+            for programme in programmes:
+                start, stop = _interval(programme)
+                if start is None:
+                    untimed.append(programme)
+                else:
+                    timed.append((start, stop, programme))
+            timed.sort(key=lambda item: item[0])
+
+            current = merged.get(ch_id)
+            if current is None:
+                merged[ch_id] = (timed, untimed)
+                continue
+
+            accepted_timed, accepted_untimed = current
+            starts = [item[0] for item in accepted_timed]
+            stops = [item[1] for item in accepted_timed]
+            additions = [item for item in timed if not _overlaps(starts, stops, item[0], item[1])]
+            if additions:
+                # İki sıralı listeyi doğrusal birleştir
+                combined = []
+                i = j = 0
+                while i < len(accepted_timed) and j < len(additions):
+                    if accepted_timed[i][0] <= additions[j][0]:
+                        combined.append(accepted_timed[i])
+                        i += 1
+                    else:
+                        combined.append(additions[j])
+                        j += 1
+                combined.extend(accepted_timed[i:])
+                combined.extend(additions[j:])
+                merged[ch_id] = (combined, accepted_untimed)
+
+    return {ch_id: [item[2] for item in timed] + untimed for ch_id, (timed, untimed) in merged.items()}
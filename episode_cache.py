@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Bölüm sayfası -> m3u8 adresi önbelleği (imzalı adresin kendi süresine göre TTL, diskte saklanır)
+"""
+
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Adreste süre bilgisi yoksa kayıt bu kadar saniye geçerli
+DEFAULT_TTL = 24 * 3600
+# Süresi dolmak üzere olan adresi verme (oynatıcı açılana kadar geçerli kalsın)
+EXPIRY_MARGIN = 15 * 60
+
+# Mutlak bitiş zamanı (epoch) taşıyan sorgu parametreleri
+_EXPIRY_PARAMS = ('expires', 'expire', 'exp', 'e', 'Expires')
+# Akamai/CDN token'ları: ".../exp=1700000000~acl=..." veya "hdnts=exp=...~"
+_PATH_EXPIRY = re.compile(r'(?:^|[~/?&=])exp=(\d{10})')
+
+
+def url_expiry(url, default_ttl=DEFAULT_TTL, now=None):
+    """İmzalı adresin bitiş zamanı (epoch); bilgi yoksa now + default_ttl"""
+    now = now or time.time()
+    query = parse_qs(urlparse(url).query)
+
+    for key in _EXPIRY_PARAMS:
+        value = query.get(key, [''])[0]
+        if value.isdigit() and int(value) > 1e9:
+            return int(value)
+
+    # AWS tarzı: X-Amz-Date (başlangıç) + X-Amz-Expires (saniye)
+    amz_date = query.get('X-Amz-Date', [''])[0]
+    amz_expires = query.get('X-Amz-Expires', [''])[0]
+    if amz_date and amz_expires.isdigit():
+        try:
+            signed = datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+            return int(signed.timestamp()) + int(amz_expires)
+        except ValueError:
+            pass
+
+    match = _PATH_EXPIRY.search(url)
+    if match:
+        return int(match.group(1))
+
+    return int(now + default_ttl)
+
+
+class EpisodeCache:
+    """Her bölüm sayfası için çözülmüş m3u8 adresini adresin süresi dolana kadar tutar"""
+
+    def __init__(self, default_ttl=DEFAULT_TTL, margin=EXPIRY_MARGIN):
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """Önbelleği dosyadan yükle, süresi dolan kayıtları at"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        now = time.time()
+        with self._lock:
+            self.entries = {
+                page_url: entry
+                for page_url, entry in data.get('episodes', {}).items()
+                if entry.get('expires', 0) - self.margin > now
+            }
+        return True
+
+    def save(self, path):
+        """Önbelleği dosyaya yaz"""
+        with self._lock:
+            data = {'episodes': self.entries}
+            path = Path(path)
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            tmp_path.replace(path)
+
+    def get(self, page_url):
+        """Geçerli kayıt varsa m3u8 adresini döndür"""
+        with self._lock:
+            entry = self.entries.get(page_url)
+            if not entry:
+                return None
+            if entry.get('expires', 0) - self.margin <= time.time():
+                del self.entries[page_url]
+                return None
+            return entry['video_url']
+
+    def put(self, page_url, video_url):
+        """Bölümün m3u8 adresini bitiş zamanıyla birlikte kaydet"""
+        now = time.time()
+        with self._lock:
+            self.entries[page_url] = {
+                'video_url': video_url,
+                'resolved': int(now),
+                'expires': url_expiry(video_url, self.default_ttl, now),
+            }
+
+    def __len__(self):
+        return len(self.entries)
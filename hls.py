@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+HLS master playlist modeli - ayrıştırma, sıralama, filtreleme ve yazma
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+STREAM_INF = '#EXT-X-STREAM-INF:'
+
+# Ses kodekleri - RESOLUTION içermeyen ve sadece bunları taşıyan varyant audio-only sayılır
+AUDIO_CODEC_PREFIXES = ('mp4a', 'ac-3', 'ec-3', 'opus', 'flac', 'alac', 'mp3')
+
+# KEY=VALUE veya KEY="a,b" biçimindeki öznitelikler
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def parse_attributes(text):
+    """#EXT-X-...: sonrasındaki öznitelik listesini sıralı dict'e çevir"""
+    return dict(_ATTRIBUTE.findall(text))
+
+
+def _unquote(value):
+    if value and len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+@dataclass
+class Variant:
+    """#EXT-X-STREAM-INF ile tanımlanan tek bir kalite seçeneği"""
+    uri: str
+    bandwidth: int
+    average_bandwidth: Optional[int] = None
+    resolution: Optional[Tuple[int, int]] = None
+    codecs: Optional[str] = None
+    frame_rate: Optional[float] = None
+    # AUDIO, VIDEO-RANGE, CLOSED-CAPTIONS gibi diğer öznitelikler (ham hâliyle)
+    attributes: Dict[str, str] = field(default_factory=dict)
+    # STREAM-INF ile URI arasında kalan etiket satırları
+    tags: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_tag(cls, line, uri='', tags=None):
+        """#EXT-X-STREAM-INF satırından varyant oluştur"""
+        attributes = parse_attributes(line[len(STREAM_INF):])
+        bandwidth = int(attributes.pop('BANDWIDTH', 0) or 0)
+        average = attributes.pop('AVERAGE-BANDWIDTH', None)
+        resolution = attributes.pop('RESOLUTION', None)
+        codecs = attributes.pop('CODECS', None)
+        frame_rate = attributes.pop('FRAME-RATE', None)
+
+        if resolution and 'x' in resolution:
+            width, height = resolution.lower().split('x', 1)
+            resolution = (int(width), int(height))
+        else:
+            resolution = None
+
+        return cls(
+            uri=uri,
+            bandwidth=bandwidth,
+            average_bandwidth=int(average) if average else None,
+            resolution=resolution,
+            codecs=_unquote(codecs) if codecs else None,
+            frame_rate=float(frame_rate) if frame_rate else None,
+            attributes=attributes,
+            tags=list(tags or []),
+        )
+
+    @property
+    def height(self):
+        return self.resolution[1] if self.resolution else None
+
+    @property
+    def is_audio_only(self):
+        """Görüntü içermeyen varyant mı"""
+        if self.resolution or not self.codecs:
+            return False
+        return all(codec.strip().startswith(AUDIO_CODEC_PREFIXES) for codec in self.codecs.split(','))
+
+    def to_tag(self):
+        """Varyantı #EXT-X-STREAM-INF satırına çevir"""
+        parts = [f'BANDWIDTH={self.bandwidth}']
+        if self.average_bandwidth is not None:
+            parts.append(f'AVERAGE-BANDWIDTH={self.average_bandwidth}')
+        if self.resolution:
+            parts.append(f'RESOLUTION={self.resolution[0]}x{self.resolution[1]}')
+        if self.codecs:
+            parts.append(f'CODECS="{self.codecs}"')
+        if self.frame_rate is not None:
+            parts.append(f'FRAME-RATE={self.frame_rate:g}')
+        parts.extend(f'{key}={value}' for key, value in self.attributes.items())
+        return STREAM_INF + ','.join(parts)
+
+
+@dataclass
+class MasterPlaylist:
+    """Oturum etiketleri + varyant listesi"""
+    session_tags: List[str] = field(default_factory=list)
+    variants: List[Variant] = field(default_factory=list)
+
+    def sort_by_bandwidth(self, descending=True):
+        """Varyantları gerçek bant genişliğine göre sırala (eşitlerde sıra korunur)"""
+        self.variants.sort(key=lambda v: v.bandwidth, reverse=descending)
+        return self
+
+    def filtered(self, max_height=None, audio_only=False):
+        """Filtrelenmiş varyantlarla yeni bir playlist döndür"""
+        variants = self.variants
+        if audio_only:
+            variants = [v for v in variants if v.is_audio_only]
+        if max_height:
+            variants = [v for v in variants if v.height is None or v.height <= max_height]
+        return MasterPlaylist(list(self.session_tags), list(variants))
+
+    def iter_lines(self):
+        """Playlist satırlarını sırayla üret"""
+        yield '#EXTM3U'
+        yield from self.session_tags
+        for variant in self.variants:
+            yield variant.to_tag()
+            yield from variant.tags
+            yield variant.uri
+
+    def dumps(self):
+        """Playlist'i metne çevir"""
+        return '\n'.join(self.iter_lines())
+
+
+def parse_master(source: Union[str, Iterable[str]]):
+    """Master playlist'i tek geçişte ayrıştır; metin ya da satır iterable'ı alır"""
+    lines = source.splitlines() if isinstance(source, str) else source
+    playlist = MasterPlaylist()
+    pending = None
+    pending_tags = []
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line or line == '#EXTM3U':
+            continue
+
+        if line.startswith(STREAM_INF):
+            pending = line
+            pending_tags = []
+        elif line.startswith('#'):
+            if pending is not None:
+                pending_tags.append(line)
+            elif line.startswith('#EXT'):
+                playlist.session_tags.append(line)
+        elif pending is not None:
+            playlist.variants.append(Variant.from_tag(pending, line, pending_tags))
+            pending = None
+            pending_tags = []
+
+    return playlist
+
+
+def target_duration(text):
+    """Media playlist'in #EXT-X-TARGETDURATION değeri (yoksa None)"""
+    match = re.search(r'^#EXT-X-TARGETDURATION:\s*(\d+(?:\.\d+)?)', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def is_master(text):
+    """Metin bir master playlist mi (en az bir STREAM-INF içeriyor mu)"""
+    return STREAM_INF in text
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Kendi sunucumuzda çalışan HLS origin kalkanı - worker.js ile aynı /checklist/ ve /proxy/ şeması
+
+- Playlist'ler hedef segment süresine göre kısa TTL ile önbelleklenir
+- Segmentler bellek sınırlı bir LRU önbellekte tutulur
+- Aynı adres için eşzamanlı istekler tek upstream isteğinde birleştirilir
+- /proxy/ sadece upstream host'una ve yeniden yazılan playlist'lerde geçen host'lara gider
+
+Kullanım:
+    python hls_proxy.py --port 8080
+    python hls_proxy.py --base-url https://cdn.example/live/ --cache-mb 512
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import quote, unquote, urljoin, urlsplit
+
+import requests
+
+from http_client import HttpClient
+
+HOST = os.getenv("PROXY_HOST", "127.0.0.1")
+PORT = int(os.getenv("PROXY_PORT", "8080"))
+# Boşsa worker.js içindeki BASE_URL kullanılır (update_worker.py onu güncel tutar)
+BASE_URL = os.getenv("PROXY_BASE_URL", "")
+BASE_SCRIPT_PATH = "worker.js"
+SEGMENT_CACHE_MB = int(os.getenv("PROXY_CACHE_MB", "256"))
+UPSTREAM_TIMEOUT = 10
+UPSTREAM_POOL = 32
+
+# Playlist TTL = hedef süre * bu oran (istemciler hedef süre aralığıyla yoklar), sınırlar dahilinde
+PLAYLIST_TTL_RATIO = 0.5
+PLAYLIST_TTL_MIN = 0.5
+PLAYLIST_TTL_MAX = 5.0
+# Hedef süre okunamazsa (master playlist vb.)
+PLAYLIST_TTL_DEFAULT = 2.0
+# Önbellekte tutulan en fazla playlist sayısı (en eski kullanılan atılır)
+PLAYLIST_CACHE_MAX = 1024
+# /proxy/ için izinli tutulan en fazla host sayısı (playlist'lerden öğrenilen, LRU)
+ALLOWED_HOSTS_MAX = 1024
+
+PLAYLIST_TYPE = "application/vnd.apple.mpegurl"
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
+}
+TARGET_DURATION = re.compile(r'^#EXT-X-TARGETDURATION:\s*(\d+(?:\.\d+)?)', re.MULTILINE)
+URI_ATTRIBUTE = re.compile(r'URI="([^"]+)"')
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           403: "Forbidden",
+           405: "Method Not Allowed", 500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+def read_worker_base_url(path=BASE_SCRIPT_PATH):
+    """worker.js içindeki const BASE_URL değeri"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            match = re.search(r'const BASE_URL\s*=\s*"(.*?)"', f.read())
+        return match.group(1) if match else ""
+    except OSError:
+        return ""
+
+
+def encode_uri_component(value):
+    """JavaScript encodeURIComponent ile aynı kaçış"""
+    return quote(value, safe="-_.!~*'()")
+
+
+def proxy_path(uri):
+    return f"/proxy/{encode_uri_component(uri)}"
+
+
+def rewrite_playlist(text, playlist_url, hosts=None):
+    """Segment / alt playlist / anahtar adreslerini mutlak hâle getirip /proxy/ üzerinden yönlendir
+
+    worker.js sadece https:// adresleri değiştirir; burada göreli adresler de playlist
+    adresine göre çözülür ki istemci upstream'e hiç gitmesin. hosts verilirse yönlendirilen
+    adreslerin host'ları eklenir.
+    """
+    def proxied(uri):
+        absolute = urljoin(playlist_url, uri)
+        if hosts is not None:
+            hosts.add(urlsplit(absolute).hostname)
+        return proxy_path(absolute)
+
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            lines.append(line)
+        elif stripped.startswith("#"):
+            lines.append(URI_ATTRIBUTE.sub(lambda m: f'URI="{proxied(m.group(1))}"', line))
+        else:
+            lines.append(proxied(stripped))
+    return "\n".join(lines) + "\n"
+
+
+def playlist_ttl(text):
+    """Playlist'in önbellekte kalacağı süre: hedef segment süresine hizalı"""
+    match = TARGET_DURATION.search(text)
+    if not match:
+        return PLAYLIST_TTL_DEFAULT
+    return min(PLAYLIST_TTL_MAX, max(PLAYLIST_TTL_MIN, float(match.group(1)) * PLAYLIST_TTL_RATIO))
+
+
+def is_playlist(url, content_type):
+    return "mpegurl" in (content_type or "").lower() or url.split("?", 1)[0].endswith(".m3u8")
+
+
+class SegmentCache:
+    """Toplam bayt sınırlı LRU önbellek"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # Tek segment önbelleğin küçük bir kısmından büyükse saklanmaz (hepsini silip atmasın)
+        self.max_item = max_bytes // 8
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, content_type, body):
+        if len(body) > self.max_item:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key)[1])
+        self.entries[key] = (content_type, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, old_body) = self.entries.popitem(last=False)
+            self.size -= len(old_body)
+
+
+class PlaylistCache:
+    """Süreli (TTL) ve adet sınırlı LRU playlist önbelleği"""
+
+    def __init__(self, max_items=PLAYLIST_CACHE_MAX):
+        self.max_items = max_items
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, ttl, body):
+        self.entries.pop(key, None)
+        self.entries[key] = (time.monotonic() + ttl, body)
+        while len(self.entries) > self.max_items:
+            self.entries.popitem(last=False)
+
+
+class Upstream:
+    """Bağlantı havuzlu upstream istemcisi (istekler thread'de, event loop bloklanmaz)"""
+
+    def __init__(self, referer, pool_size=UPSTREAM_POOL):
+        # Canlı yayında geç yanıt işe yaramaz: tek tekrar, kısa backoff
+        self.client = HttpClient(pool_size=pool_size, timeout=UPSTREAM_TIMEOUT, retries=1,
+                                 backoff=0.25, max_backoff=1.0)
+        self.referer = referer
+
+    def fetch_sync(self, url):
+        headers = {"Referer": self.referer} if self.referer else {}
+        r = self.client.get(url, headers=headers)
+        return r.status_code, r.headers.get("Content-Type", "application/octet-stream"), r.content, r.url
+
+    async def fetch(self, url):
+        return await asyncio.to_thread(self.fetch_sync, url)
+
+
+class HLSProxy:
+    """/checklist/ ve /proxy/ isteklerini önbellek ve istek birleştirme ile karşılar"""
+
+    def __init__(self, base_url, cache_bytes=SEGMENT_CACHE_MB * 1024 * 1024):
+        self.base_url = base_url
+        self.upstream = Upstream(base_url)
+        self.segments = SegmentCache(cache_bytes)
+        self.playlists = PlaylistCache()
+        self.inflight = {}
+        self.upstream_host = urlsplit(base_url).hostname
+        self.allowed_hosts = OrderedDict()
+        self.stats = {"requests": 0, "playlist_hits": 0, "segment_hits": 0,
+                      "coalesced": 0, "upstream": 0, "upstream_errors": 0, "rejected": 0}
+
+    def is_allowed(self, url):
+        """/proxy/ hedefi: http(s) ve upstream ya da yeniden yazılan bir playlist'te geçen host"""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return False
+        if parts.hostname == self.upstream_host:
+            return True
+        if parts.hostname in self.allowed_hosts:
+            self.allowed_hosts.move_to_end(parts.hostname)
+            return True
+        return False
+
+    def rewrite(self, url, text, final_url):
+        """Playlist'i yeniden yaz, içindeki host'lara izin ver ve önbelleğe al"""
+        hosts = set()
+        rewritten = rewrite_playlist(text, final_url, hosts).encode("utf-8")
+        for host in hosts:
+            if host:
+                self.allowed_hosts.pop(host, None)
+                self.allowed_hosts[host] = True
+        while len(self.allowed_hosts) > ALLOWED_HOSTS_MAX:
+            self.allowed_hosts.popitem(last=False)
+        self.playlists.put(url, playlist_ttl(text), rewritten)
+        return rewritten
+
+    async def coalesced(self, key, factory):
+        """Aynı anahtar için süren bir istek varsa onun sonucunu bekle, yoksa başlat"""
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await factory()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Bekleyen yoksa "exception was never retrieved" uyarısı çıkmasın
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+            # İptal (BaseException) sonrası bekleyenler askıda kalmasın: hata ile sonuçlandır
+            if not future.done():
+                future.set_exception(requests.ConnectionError(f"Upstream isteği iptal edildi: {key}"))
+                future.exception()
+
+    async def fetch_upstream(self, url):
+        self.stats["upstream"] += 1
+        try:
+            return await self.upstream.fetch(url)
+        except requests.RequestException:
+            self.stats["upstream_errors"] += 1
+            raise
+
+    async def playlist(self, url):
+        """Yeniden yazılmış playlist (TTL süresince önbellekten)"""
+        cached = self.playlists.get(url)
+        if cached is not None:
+            self.stats["playlist_hits"] += 1
+            return 200, PLAYLIST_TYPE, cached
+
+        async def load():
+            status, content_type, body, final_url = await self.fetch_upstream(url)
+            if status != 200:
+                return status, content_type, body
+            return 200, PLAYLIST_TYPE, self.rewrite(url, body.decode("utf-8", "replace"), final_url)
+
+        return await self.coalesced(url, load)
+
+    async def proxied(self, url):
+        """Segment (LRU önbellekten) ya da /proxy/ üzerinden istenen alt playlist"""
+        if url.split("?", 1)[0].endswith(".m3u8"):
+            return await self.playlist(url)
+
+        cached = self.segments.get(url)
+        if cached is not None:
+            self.stats["segment_hits"] += 1
+            return 200, cached[0], cached[1]
+
+        async def load():
+            status, content_type, body, final_url = await self.fetch_upstream(url)
+            if status == 200 and is_playlist(final_url, content_type):
+                return 200, PLAYLIST_TYPE, self.rewrite(url, body.decode("utf-8", "replace"), final_url)
+            if status == 200:
+                self.segments.put(url, content_type, body)
+            return status, content_type, body
+
+        return await self.coalesced(url, load)
+
+    async def route(self, method, path):
+        if method == "OPTIONS":
+            return 204, "text/plain", b""
+        if method not in ("GET", "HEAD"):
+            return 405, "text/plain", b"Method Not Allowed"
+
+        path = path.split("#", 1)[0]
+        try:
+            if path.startswith("/proxy/"):
+                url = unquote(path[len("/proxy/"):])
+                if not self.is_allowed(url):
+                    self.stats["rejected"] += 1
+                    return 403, "text/plain", b"Forbidden"
+                return await self.proxied(url)
+            if path.startswith("/checklist/"):
+                cid = path.split("/checklist/", 1)[1]
+                return await self.playlist(f"{self.base_url}{cid}")
+        except requests.RequestException as e:
+            return 502, "text/plain", f"Proxy Error: {e}".encode("utf-8")
+
+        if path == "/stats":
+            stats = dict(self.stats, segment_cache_bytes=self.segments.size,
+                         segment_cache_items=len(self.segments.entries), playlists=len(self.playlists.entries),
+                         connections=self.upstream.client.connection_stats())
+            return 200, "application/json", json.dumps(stats).encode("utf-8")
+        return 200, "text/plain; charset=utf-8", "HLS proxy aktif 🚀".encode("utf-8")
+
+    async def handle(self, reader, writer):
+        """Tek bağlantı: keep-alive ile art arda istekleri karşıla"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split(" ")
+                if len(parts) != 3:
+                    return
+                method, path, version = parts
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                self.stats["requests"] += 1
+                try:
+                    status, content_type, body = await self.route(method, path)
+                except Exception as e:
+                    status, content_type, body = 500, "text/plain", f"Error: {e}".encode("utf-8")
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                response_headers = {
+                    **CORS_HEADERS,
+                    "Content-Type": content_type,
+                    "Content-Length": str(len(body)),
+                    "Connection": "keep-alive" if keep_alive else "close",
+                }
+                out = [f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}"]
+                out += [f"{key}: {value}" for key, value in response_headers.items()]
+                writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, base_url, cache_mb):
+    proxy = HLSProxy(base_url, cache_mb * 1024 * 1024)
+    server = await asyncio.start_server(proxy.handle, host, port)
+    print(f"🚀 HLS proxy http://{host}:{port} → {base_url} (segment önbelleği {cache_mb} MB)")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Caching HLS proxy with the worker.js URL scheme")
+    parser.add_argument("--host", default=HOST, help=f"Listen address (default: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Listen port (default: {PORT})")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="Upstream playlist base URL (default: BASE_URL in worker.js)")
+    parser.add_argument("--cache-mb", type=int, default=SEGMENT_CACHE_MB,
+                        help=f"Segment cache size in MB (default: {SEGMENT_CACHE_MB})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    base_url = args.base_url or read_worker_base_url()
+    if not base_url:
+        raise SystemExit("❌ Base URL bulunamadı (--base-url, PROXY_BASE_URL ya da worker.js).")
+    try:
+        asyncio.run(serve(args.host, args.port, base_url, args.cache_mb))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Ortak HTTP istemcisi - eşzamanlılığa göre boyutlanan keep-alive havuzu, isteğe bağlı HTTP/2,
+süreç içi DNS önbelleği, jitter'lı backoff + Retry-After ile tekrar, diske akışlı indirme
+ve host başına bağlantı istatistikleri (çalışma raporuna eklenir)
+"""
+
+import os
+import random
+import socket
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 2
+# Tekrar beklemesi: backoff * 2^(deneme-1) üst sınırına kadar rastgele (full jitter)
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Sonucu değiştirmeden tekrarlanabilen metotlar; POST sadece retries açıkça verilirse tekrarlanır
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+DOWNLOAD_CHUNK = 256 * 1024
+
+# HTTP2=1 ile httpx[http2] kuruluysa HTTP/2 kullanılır
+HTTP2 = os.getenv("HTTP2", "0") == "1"
+# Çözülmüş adreslerin süreç içinde tutulma süresi (sn); 0 = kapalı
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "300"))
+
+_original_getaddrinfo = socket.getaddrinfo
+_dns_cache = {}
+_dns_lock = threading.Lock()
+_dns_ttl = DNS_CACHE_TTL
+dns_stats = {'hits': 0, 'misses': 0}
+
+
+def _cached_getaddrinfo(*args, **kwargs):
+    key = (args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            dns_stats['hits'] += 1
+            return entry[1]
+    result = _original_getaddrinfo(*args, **kwargs)
+    with _dns_lock:
+        dns_stats['misses'] += 1
+        _dns_cache[key] = (now + _dns_ttl, result)
+    return result
+
+
+def enable_dns_cache(ttl=DNS_CACHE_TTL):
+    """socket.getaddrinfo'yu TTL'li önbellekle sar (süreç genelinde, bir kez)"""
+    global _dns_ttl
+    _dns_ttl = ttl
+    if ttl > 0 and socket.getaddrinfo is not _cached_getaddrinfo:
+        socket.getaddrinfo = _cached_getaddrinfo
+
+
+def parse_retry_after(value):
+    """Retry-After başlığı (saniye ya da HTTP tarihi) -> saniye, okunamazsa None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt, backoff=DEFAULT_BACKOFF, max_backoff=MAX_BACKOFF, response=None):
+    """attempt. tekrar öncesi bekleme: Retry-After varsa o, yoksa full jitter'lı üstel backoff"""
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            return min(retry_after, max_backoff)
+    return random.uniform(0, min(max_backoff, backoff * (2 ** (attempt - 1))))
+
+
+def _load_httpx():
+    try:
+        import httpx
+        import h2  # noqa: F401 - httpx'in HTTP/2 desteği için gerekli
+        return httpx
+    except ImportError:
+        return None
+
+
+class _H2Response:
+    """httpx yanıtını bu repodaki requests kullanımıyla uyumlu gösterir"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def json(self):
+        self._response.read()
+        return self._response.json()
+
+    def iter_content(self, chunk_size=DOWNLOAD_CHUNK):
+        return self._response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpClient:
+    """Scriptlerin ortak HTTP istemcisi
+
+    Tek bir Session (ya da HTTP/2 için httpx.Client) üzerinden bağlantıları yeniden kullanır;
+    metrics verilirse her deneme RunMetrics'e kaydedilir ve bağlantı istatistikleri rapora eklenir.
+    """
+
+    def __init__(self, pool_size=10, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_backoff=MAX_BACKOFF, retry_statuses=RETRY_STATUSES,
+                 headers=None, http2=HTTP2, metrics=None, dns_cache_ttl=DNS_CACHE_TTL):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = tuple(retry_statuses)
+        self.metrics = metrics
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self.resize(pool_size)
+
+        self._h2 = None
+        if http2:
+            httpx = _load_httpx()
+            if httpx is None:
+                print("⚠ HTTP/2 için httpx[http2] kurulu değil, HTTP/1.1 kullanılıyor.")
+            else:
+                self._httpx = httpx
+                self._h2 = httpx.Client(
+                    http2=True,
+                    headers=dict(self.session.headers),
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                )
+
+        if dns_cache_ttl:
+            enable_dns_cache(dns_cache_ttl)
+        if metrics is not None:
+            metrics.add_section('connections', self.connection_stats)
+
+    def resize(self, pool_size):
+        """Bağlantı havuzunu eşzamanlılık seviyesine göre (yeniden) boyutlandır"""
+        self.pool_size = pool_size
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    # --- tek deneme ---
+
+    def _send(self, method, url, **kwargs):
+        if self._h2 is None:
+            return self.session.request(method, url, **kwargs)
+
+        httpx = self._httpx
+        stream = kwargs.pop('stream', False)
+        data = kwargs.pop('data', None)
+        request = self._h2.build_request(
+            method, url,
+            headers=kwargs.pop('headers', None),
+            params=kwargs.pop('params', None),
+            content=data if isinstance(data, (bytes, str)) else None,
+            data=data if isinstance(data, dict) else None,
+            timeout=kwargs.pop('timeout', self.timeout),
+        )
+        follow = kwargs.pop('allow_redirects', True)
+        try:
+            return _H2Response(self._h2.send(request, stream=stream, follow_redirects=follow))
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    def _attempt(self, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self._send(method, url, **kwargs)
+        except requests.RequestException as e:
+            if self.metrics is not None:
+                self.metrics.record_http(url, method, None, time.perf_counter() - start, e)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_http(url, method, response.status_code, time.perf_counter() - start)
+        return response
+
+    # --- genel istek ---
+
+    def request(self, method, url, retries=None, **kwargs):
+        """Zaman aşımı ve tekrar politikasıyla istek; tekrarlar bitince son yanıtı döndürür"""
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            try:
+                response = self._attempt(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                time.sleep(retry_delay(attempt, self.backoff, self.max_backoff))
+                continue
+
+            if response.status_code not in self.retry_statuses or attempt >= retries:
+                return response
+            attempt += 1
+            delay = retry_delay(attempt, self.backoff, self.max_backoff, response)
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        # requests.head ile aynı: yönlendirme takip edilmez
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def download(self, url, path, chunk_size=DOWNLOAD_CHUNK, **kwargs):
+        """Yanıtı belleğe almadan diske yaz (önce .tmp, sonra os.replace)
+
+        200 dışındaki yanıtlarda (ör. 304) dosyaya dokunulmaz; yanıt her durumda döndürülür.
+        """
+        response = self.get(url, stream=True, **kwargs)
+        with response:
+            if response.status_code != 200:
+                return response
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    if chunk:
+                        f.write(chunk)
+            os.replace(tmp_path, path)
+        return response
+
+    # --- istatistik ---
+
+    def connection_stats(self):
+        """Host başına açılan bağlantı ve yapılan istek sayısı (urllib3 havuzlarından)"""
+        hosts = {}
+        adapters = {id(a): a for a in self.session.adapters.values()}.values()
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                entry = hosts.setdefault(pool.host, {'connections': 0, 'requests': 0})
+                entry['connections'] += pool.num_connections
+                entry['requests'] += pool.num_requests
+        for entry in hosts.values():
+            entry['reuse_ratio'] = round(1 - entry['connections'] / entry['requests'], 3) if entry['requests'] else 0.0
+        if hosts or dns_stats['hits'] or dns_stats['misses']:
+            hosts['_dns'] = dict(dns_stats)
+        return hosts
+
+    def close(self):
+        self.session.close()
+        if self._h2 is not None:
+            self._h2.close()
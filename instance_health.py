@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Invidious instance sağlık takibi - gecikme EWMA'sı, başarı oranı ve devre kesici
+"""
+
+import json
+import random
+import threading
+import time
+from pathlib import Path
+
+# EWMA ağırlığı (yeni ölçümün payı)
+EWMA_ALPHA = 0.3
+# Bu kadar ardışık hatadan sonra devre açılır
+FAILURE_THRESHOLD = 3
+# Açık devreye kaç saniyede bir deneme isteği gönderilir
+PROBE_INTERVAL = 300
+# Hiç ölçülmemiş host için varsayılan gecikme (saniye)
+DEFAULT_LATENCY = 2.0
+
+
+def _new_entry():
+    return {
+        'successes': 0,
+        'failures': 0,
+        'success_rate': 1.0,
+        'latency': None,
+        'consecutive_failures': 0,
+        'opened_at': None,
+        'last_probe': None,
+    }
+
+
+class InstanceHealth:
+    """Host başına sağlık skorlarını tutar ve en uygun instance'ı seçer"""
+
+    def __init__(self, instances, alpha=EWMA_ALPHA, failure_threshold=FAILURE_THRESHOLD,
+                 probe_interval=PROBE_INTERVAL):
+        self.instances = list(instances)
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.stats = {instance: _new_entry() for instance in self.instances}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """Önceki çalıştırmanın skorlarını dosyadan yükle"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        for instance, saved in data.get('instances', {}).items():
+            if instance in self.stats:
+                entry = _new_entry()
+                entry.update({k: v for k, v in saved.items() if k in entry})
+                self.stats[instance] = entry
+        return True
+
+    def merge(self, path):
+        """Başka bir çalıştırmanın (ör. shard) skorlarını birleştir; en çok ölçüm içeren kayıt kalır"""
+        other = InstanceHealth(self.instances)
+        if not other.load(path):
+            return False
+        with self._lock:
+            for instance, entry in other.stats.items():
+                current = self.stats[instance]
+                if entry['successes'] + entry['failures'] > current['successes'] + current['failures']:
+                    self.stats[instance] = entry
+        return True
+
+    def save(self, path):
+        """Skorları bir sonraki çalıştırma için dosyaya yaz"""
+        with self._lock:
+            data = {
+                'updated': int(time.time()),
+                'instances': self.stats,
+            }
+            path = Path(path)
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            tmp_path.replace(path)
+
+    def is_open(self, instance):
+        """Devre açık mı (host art arda hata veriyor mu)"""
+        return self.stats[instance]['opened_at'] is not None
+
+    def score(self, instance):
+        """Başarı oranı / gecikme - yüksek skor daha iyi host demek"""
+        entry = self.stats[instance]
+        latency = entry['latency'] if entry['latency'] is not None else DEFAULT_LATENCY
+        return entry['success_rate'] / max(latency, 0.05)
+
+    def pick(self, exclude=()):
+        """Skora göre ağırlıklı bir instance seç; açık devrelere ara ara deneme gönder"""
+        now = time.time()
+        with self._lock:
+            candidates = [i for i in self.instances if i not in exclude] or self.instances
+
+            # Deneme zamanı gelmiş açık devre varsa tek bir isteği ona ver
+            for instance in candidates:
+                entry = self.stats[instance]
+                if entry['opened_at'] is None:
+                    continue
+                last = entry['last_probe'] or entry['opened_at']
+                if now - last >= self.probe_interval:
+                    entry['last_probe'] = now
+                    return instance
+
+            closed = [i for i in candidates if self.stats[i]['opened_at'] is None]
+            if not closed:
+                # Hepsi açık: en uzun süredir denenmemiş olanı seç
+                return min(candidates, key=lambda i: self.stats[i]['last_probe'] or self.stats[i]['opened_at'])
+
+            weights = [self.score(i) for i in closed]
+            return random.choices(closed, weights=weights, k=1)[0]
+
+    def record(self, instance, ok, elapsed=None):
+        """İstek sonucunu kaydet, EWMA'ları ve devre durumunu güncelle"""
+        if instance not in self.stats:
+            return
+        with self._lock:
+            entry = self.stats[instance]
+            a = self.alpha
+            entry['success_rate'] = (1 - a) * entry['success_rate'] + a * (1.0 if ok else 0.0)
+
+            if elapsed is not None:
+                if entry['latency'] is None:
+                    entry['latency'] = elapsed
+                else:
+                    entry['latency'] = (1 - a) * entry['latency'] + a * elapsed
+
+            if ok:
+                entry['successes'] += 1
+                entry['consecutive_failures'] = 0
+                entry['opened_at'] = None
+                entry['last_probe'] = None
+            else:
+                entry['failures'] += 1
+                entry['consecutive_failures'] += 1
+                if entry['consecutive_failures'] >= self.failure_threshold:
+                    entry['opened_at'] = time.time()
+                    entry['last_probe'] = None
+
+    def summary(self):
+        """Skora göre sıralanmış (instance, entry) listesi"""
+        with self._lock:
+            return sorted(self.stats.items(), key=lambda item: self.score(item[0]), reverse=True)
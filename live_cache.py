@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Kanal -> canlı yayın videoId önbelleği (TTL'li, diskte saklanır)
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+# Kayıt bu kadar saniye doğrulanmazsa geçersiz sayılır
+DEFAULT_TTL = 48 * 3600
+
+
+class LiveVideoCache:
+    """Her kanal için son bilinen canlı videoId'yi tutar"""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """Önbelleği dosyadan yükle, süresi dolan kayıtları at"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        now = time.time()
+        with self._lock:
+            self.entries = {
+                channel_id: entry
+                for channel_id, entry in data.get('channels', {}).items()
+                if now - entry.get('checked', 0) < self.ttl
+            }
+        return True
+
+    def merge(self, path):
+        """Başka bir çalıştırmanın (ör. shard) önbelleğini birleştir; kanal başına en yeni kayıt kalır"""
+        other = LiveVideoCache(self.ttl)
+        if not other.load(path):
+            return False
+        with self._lock:
+            for channel_id, entry in other.entries.items():
+                current = self.entries.get(channel_id)
+                if current is None or entry.get('checked', 0) > current.get('checked', 0):
+                    self.entries[channel_id] = entry
+        return True
+
+    def save(self, path):
+        """Önbelleği dosyaya yaz"""
+        with self._lock:
+            data = {'channels': self.entries}
+            path = Path(path)
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            tmp_path.replace(path)
+
+    def get(self, channel_id):
+        """Geçerli kayıt varsa videoId'yi döndür"""
+        with self._lock:
+            entry = self.entries.get(channel_id)
+            if not entry:
+                return None
+            if time.time() - entry.get('checked', 0) >= self.ttl:
+                del self.entries[channel_id]
+                return None
+            return entry['video_id']
+
+    def put(self, channel_id, video_id):
+        """Kanalın canlı videoId'sini kaydet (ya da doğrulama zamanını yenile)"""
+        with self._lock:
+            self.entries[channel_id] = {'video_id': video_id, 'checked': int(time.time())}
+
+    def drop(self, channel_id):
+        """Kanalın kaydını sil"""
+        with self._lock:
+            self.entries.pop(channel_id, None)
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,53 +1,436 @@
+import hashlib
+import json
 import os
-import requests
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from xml.sax.saxutils import quoteattr
 import dropbox
 
+from epg_compact import ProgrammeWindow, build_shards, write_gzip
+from epg_merge import ChannelIndex, display_names, merge_programmes
+from http_client import HttpClient
+from run_metrics import RunMetrics
+
 # ----------------- Ayarlar -----------------
 XML_URL = "https://belgeselsemo.com.tr/yayin-akisi2/xml/turkey3.xml"
 LOCAL_XML = "epg.xml"
 UPDATED_XML = "epg_updated.xml"
 CHANNEL_ID_FILE = "kanalid.txt"
 DROPBOX_PATH = "/epg_updated.xml"
+GZIP_XML = UPDATED_XML + ".gz"
+DROPBOX_GZIP_PATH = DROPBOX_PATH + ".gz"
+
+# Birden fazla kaynak (virgülle ayrılmış, öncelik sırasıyla). Boşsa sadece XML_URL kullanılır;
+# ilk kaynağın programları esas alınır, sonrakiler sadece boşlukları doldurur.
+EPG_SOURCES = [u.strip() for u in os.getenv("EPG_SOURCES", "").split(",") if u.strip()] or [XML_URL]
+# Ham XML'lerin saklandığı dizin (304 gelen kaynak ya da pencere kayması buradan yeniden derlenir)
+EPG_SOURCES_DIR = os.getenv("EPG_SOURCES_DIR", "epg_sources")
+
+# Yayın penceresi (saat): bitişi bundan eski / başlangıcı bundan ileri programlar atılır.
+# Boş bırakılırsa o yönde sınır uygulanmaz.
+EPG_PAST_HOURS = os.getenv("EPG_PAST_HOURS", "6")
+EPG_FUTURE_HOURS = os.getenv("EPG_FUTURE_HOURS", "72")
+# Pencere son derlemeden bu yana bu kadar saat kaydıysa kaynak değişmese de yeniden derlenir
+EPG_WINDOW_REFRESH_HOURS = float(os.getenv("EPG_WINDOW_REFRESH_HOURS", "12"))
+# Kanal başına JSON parçaları (boşsa üretilmez) ve Dropbox'taki klasörü
+EPG_SHARDS_DIR = os.getenv("EPG_SHARDS_DIR", "")
+DROPBOX_SHARDS_PATH = "/epg_shards"
+
+# Tek geçişli akış modu (EPG_STREAMING=0 ile eski indir + ET.parse yoluna dönülür)
+EPG_STREAMING = os.getenv("EPG_STREAMING", "1") != "0"
+CHUNK_SIZE = 256 * 1024
+
+# Koşullu indirme (ETag / Last-Modified) durumu ve Dropbox token önbelleği
+STATE_FILE = os.getenv("EPG_STATE_FILE", "epg_state.json")
+TOKEN_CACHE_FILE = os.getenv("DROPBOX_TOKEN_CACHE", ".dropbox_token.json")
+# Bu boyuttan büyük dosyalar upload session ile parça parça yüklenir
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Dropbox content_hash blok boyutu (API tarafından sabit)
+DROPBOX_HASH_BLOCK = 4 * 1024 * 1024
+
+# Çalışma raporu (JSON) ve span kaydı (JSONL) yolları - boşsa yazılmaz
+RUN_REPORT = os.getenv("RUN_REPORT", "")
+RUN_SPANS = os.getenv("RUN_SPANS", "")
+metrics = RunMetrics("epg")
+# Kaynaklar eşzamanlı indirildiği için havuz kaynak sayısı kadar
+client = HttpClient(pool_size=max(4, len(EPG_SOURCES)), timeout=15, metrics=metrics)
 
 # Dropbox OAuth bilgilerini GitHub Secrets (ortam değişkenleri) üzerinden al
 DROPBOX_REFRESH_TOKEN = os.getenv("DROPBOX_REFRESH_TOKEN")
 DROPBOX_APP_KEY = os.getenv("DROPBOX_APP_KEY")
 DROPBOX_APP_SECRET = os.getenv("DROPBOX_APP_SECRET")
 
-# Türkçe karakter düzeltme haritası
-turkish_map = str.maketrans(
-    "ÇŞĞÜİÖçşıüö",
-    "csguiocsiuo"
-)
-
 # ----------------- Fonksiyonlar -----------------
-def download_xml():
+def rename_channel(channel, index, f_txt, source=XML_URL):
+    """<channel> id'sini display-name'den üret, eşlemeyi indekse kaydet"""
+    names = display_names(channel)
+    if names:
+        old_id = channel.get("id")
+        ch_id = index.register(source, old_id if old_id is not None else names[0], names)
+        channel.set("id", ch_id)
+        f_txt.write(f"{names[0]} => {ch_id}\n")
+
+def remap_programme(programme, index, source=XML_URL):
+    """<programme channel=...> referansını yeni kanal id'sine çevir"""
+    old_id = programme.get("channel")
+    new_id = index.resolve(source, old_id)
+    if new_id != old_id:
+        programme.set("channel", new_id)
+
+def report_collisions(index):
+    """Aynı id'ye düşen farklı kanalları uyar ve say"""
+    for c in index.collisions:
+        print(f"⚠️ Kanal id çakışması: '{c['channels'][0]}' ve '{c['channels'][1]}' -> '{c['id']}' "
+              f"({c['source']}); ikincisi '{c['assigned']}' olarak yazıldı.")
+    metrics.incr("id_collisions", len(index.collisions))
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_FILE)
+
+def conditional_headers(state):
+    """Önceki yanıtın ETag / Last-Modified değerlerinden koşullu istek başlıkları"""
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+def remember_validators(state, response):
+    state["etag"] = response.headers.get("ETag")
+    state["last_modified"] = response.headers.get("Last-Modified")
+
+def make_window():
+    """Ayarlardaki geçmiş/gelecek saatlerine göre program penceresi"""
+    past = float(EPG_PAST_HOURS) if EPG_PAST_HOURS else None
+    future = float(EPG_FUTURE_HOURS) if EPG_FUTURE_HOURS else None
+    return ProgrammeWindow(past, future)
+
+def window_moved(state):
+    """Yayınlanan rehberin penceresi eskidi mi (ayar değişti ya da son derlemeden beri kaydı)"""
+    if not EPG_PAST_HOURS and not EPG_FUTURE_HOURS:
+        return False
+    if state.get("window_hours") != [EPG_PAST_HOURS, EPG_FUTURE_HOURS]:
+        return True
+    built = state.get("window_built")
+    return built is None or time.time() - built >= EPG_WINDOW_REFRESH_HOURS * 3600
+
+def remember_window(state):
+    state["window_hours"] = [EPG_PAST_HOURS, EPG_FUTURE_HOURS]
+    state["window_built"] = time.time()
+
+def report_window(window):
+    for reason, count in window.dropped.items():
+        metrics.incr(f"dropped_{reason}", count)
+    dropped = sum(window.dropped.values())
+    if dropped:
+        print(f"✂️ {dropped} program atıldı (pencere dışı: {window.dropped['window']}, "
+              f"tekrar: {window.dropped['duplicate']}, çakışan: {window.dropped['overlap']}).")
+
+def download_xml(state):
+    """XML'i indir; kaynak değişmediyse (304) False döndür"""
     print("🔎 XML indiriliyor...")
-    r = requests.get(XML_URL, timeout=15)
-    r.raise_for_status()
-    with open(LOCAL_XML, "w", encoding="utf-8") as f:
-        f.write(r.text)
+    with metrics.stage("download"):
+        headers = conditional_headers(state) if os.path.exists(LOCAL_XML) else {}
+        r = client.download(EPG_SOURCES[0], LOCAL_XML, CHUNK_SIZE, headers=headers)
+        if r.status_code == 304:
+            return False
+        r.raise_for_status()
+    remember_validators(state, r)
     print(f"✅ {LOCAL_XML} indirildi.")
+    return True
 
 def update_channels():
-    tree = ET.parse(LOCAL_XML)
-    root = tree.getroot()
-
-    with open(CHANNEL_ID_FILE, "w", encoding="utf-8") as f_txt:
-        for channel in root.findall("channel"):
-            display_name_elem = channel.find("display-name")
-            if display_name_elem is not None:
-                name = display_name_elem.text.strip()
-                ch_id = name.lower().translate(turkish_map).replace(" ", "")
-                ch_id = ch_id.replace("hd", "").replace(".tr", "")
-                channel.set("id", ch_id)
-                f_txt.write(f"{name} => {ch_id}\n")
-
-    tree.write(UPDATED_XML, encoding="utf-8", xml_declaration=True)
+    with metrics.stage("transform"):
+        tree = ET.parse(LOCAL_XML)
+        root = tree.getroot()
+        index = ChannelIndex()
+
+        with open(CHANNEL_ID_FILE, "w", encoding="utf-8") as f_txt:
+            for channel in root.findall("channel"):
+                rename_channel(channel, index, f_txt)
+        report_collisions(index)
+
+        # Atılan programları tek seferde çıkar (root.remove her çağrıda O(n))
+        window = make_window()
+        kept = []
+        for child in root:
+            if child.tag == "programme":
+                remap_programme(child, index)
+                if not window.keep(child):
+                    continue
+            kept.append(child)
+        root[:] = kept
+        report_window(window)
+
+    with metrics.stage("save"):
+        tree.write(UPDATED_XML, encoding="utf-8", xml_declaration=True)
     print(f"✅ {UPDATED_XML} ve {CHANNEL_ID_FILE} oluşturuldu.")
 
+def rewrite_epg_stream(chunks, output_path, id_file_path, window=None, index=None):
+    """Bayt parçalarından gelen XMLTV'yi ağacı bellekte tutmadan tek geçişte yeniden yaz"""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    index = index if index is not None else ChannelIndex()
+    counts = {"channel": 0, "programme": 0}
+    depth = 0
+    root = None
+    tmp_path = output_path + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as out, \
+            open(id_file_path, "w", encoding="utf-8") as f_txt:
+        out.write("<?xml version='1.0' encoding='utf-8'?>\n")
+
+        def drain():
+            nonlocal depth, root
+            for event, elem in parser.read_events():
+                if event == "start":
+                    depth += 1
+                    if depth == 1:
+                        root = elem
+                        attrs = "".join(f" {k}={quoteattr(v)}" for k, v in elem.attrib.items())
+                        out.write(f"<{elem.tag}{attrs}>\n")
+                    continue
+
+                depth -= 1
+                if depth != 1:
+                    continue
+
+                # Kök altındaki tamamlanmış eleman: dönüştür, yaz, bellekten at
+                if elem.tag == "channel":
+                    rename_channel(elem, index, f_txt)
+                elif elem.tag == "programme":
+                    remap_programme(elem, index)
+                    if window and not window.keep(elem):
+                        root.clear()
+                        continue
+                counts[elem.tag] = counts.get(elem.tag, 0) + 1
+                elem.tail = "\n"
+                out.write(ET.tostring(elem, encoding="unicode"))
+                root.clear()
+
+        for chunk in chunks:
+            if chunk:
+                parser.feed(chunk)
+                drain()
+        parser.close()
+        drain()
+
+        if root is None:
+            raise ValueError("EPG içinde kök eleman bulunamadı")
+        out.write(f"</{root.tag}>\n")
+
+    os.replace(tmp_path, output_path)
+    return counts
+
+def tee_to_file(chunks, path):
+    """Parçaları aynen geçirirken ham kopyayı da diske yaz (akış bitince .tmp -> path)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            yield chunk
+    os.replace(tmp_path, path)
+
+def stream_epg(state, rewindow=False):
+    """XML'i indirirken kanal id'lerini yeniden yaz; kaynak değişmediyse (304) False döndür
+
+    Ham XML EPG_SOURCES_DIR altında saklanır; 304 gelse de pencere kaydıysa (rewindow) oradan
+    yeniden derlenir.
+    """
+    print("🔎 XML akış modunda indiriliyor ve dönüştürülüyor...")
+    raw_path = source_cache_path(EPG_SOURCES[0])
+    headers = conditional_headers(state) if os.path.exists(raw_path) else {}
+    with metrics.stage("transform"):
+        r = client.get(EPG_SOURCES[0], stream=True, headers=headers)
+        with r:
+            window = make_window()
+            index = ChannelIndex()
+            if r.status_code == 304:
+                if not rewindow:
+                    return False
+                print("🪟 Kaynak değişmedi, kayan pencere için ham kopyadan yeniden derleniyor...")
+                with open(raw_path, "rb") as raw:
+                    counts = rewrite_epg_stream(iter(lambda: raw.read(CHUNK_SIZE), b""), UPDATED_XML,
+                                                CHANNEL_ID_FILE, window, index)
+            else:
+                r.raise_for_status()
+                os.makedirs(EPG_SOURCES_DIR, exist_ok=True)
+                chunks = tee_to_file(r.iter_content(CHUNK_SIZE), raw_path)
+                counts = rewrite_epg_stream(chunks, UPDATED_XML, CHANNEL_ID_FILE, window, index)
+                remember_validators(state, r)
+    report_window(window)
+    report_collisions(index)
+    metrics.incr("channels", counts.get("channel", 0))
+    metrics.incr("programmes", counts.get("programme", 0))
+    print(f"✅ {UPDATED_XML} ve {CHANNEL_ID_FILE} oluşturuldu "
+          f"({counts.get('channel', 0)} kanal, {counts.get('programme', 0)} program).")
+    return True
+
+def source_cache_path(url):
+    return os.path.join(EPG_SOURCES_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest()[:12] + ".xml")
+
+def fetch_source(url, source_state):
+    """Tek kaynağı diske indir; (yol, değişti mi) döndür"""
+    path = source_cache_path(url)
+    headers = conditional_headers(source_state) if os.path.exists(path) else {}
+    with metrics.stage("download"):
+        r = client.download(url, path, CHUNK_SIZE, headers=headers)
+        if r.status_code == 304:
+            return path, False
+        r.raise_for_status()
+    remember_validators(source_state, r)
+    return path, True
+
+def download_sources(state):
+    """Tüm kaynakları eşzamanlı indir; öncelik sırasıyla [(url, yol, değişti mi)]"""
+    print(f"🔎 {len(EPG_SOURCES)} EPG kaynağı eşzamanlı indiriliyor...")
+    os.makedirs(EPG_SOURCES_DIR, exist_ok=True)
+    old_state = state.get("sources", {})
+    sources_state = state["sources"] = {url: old_state.get(url, {}) for url in EPG_SOURCES}
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=len(EPG_SOURCES)) as pool:
+        futures = {pool.submit(fetch_source, url, sources_state[url]): url for url in EPG_SOURCES}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                metrics.incr("source_errors")
+                path = source_cache_path(url)
+                if os.path.exists(path):
+                    print(f"⚠️ {url} indirilemedi ({e}), önceki kopya kullanılıyor.")
+                    results[url] = (path, False)
+                else:
+                    print(f"⚠️ {url} indirilemedi ({e}), kaynak atlandı.")
+
+    return [(url, *results[url]) for url in EPG_SOURCES if url in results]
+
+def read_source(url, path, index, channels):
+    """Kaynağın kanallarını indekse kaydet, programlarını {kanonik_id: [programme]} olarak döndür"""
+    window = make_window()
+    programmes = {}
+    root_attrs = {}
+    depth = 0
+    root = None
+
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = elem
+                root_attrs = dict(elem.attrib)
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        if elem.tag == "channel":
+            names = display_names(elem)
+            source_id = elem.get("id")
+            if names or source_id:
+                ch_id = index.register(url, source_id if source_id is not None else names[0], names)
+                if ch_id not in channels:
+                    elem.set("id", ch_id)
+                    channels[ch_id] = (elem, names[0] if names else ch_id)
+        elif elem.tag == "programme":
+            remap_programme(elem, index, url)
+            if window.keep(elem):
+                programmes.setdefault(elem.get("channel"), []).append(elem)
+        root.clear()
+
+    report_window(window)
+    return programmes, root_attrs
+
+def write_merged_epg(channels, merged, root_attrs, output_path, id_file_path):
+    """Birleşik kanalları ve programları XMLTV olarak yaz"""
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out, \
+            open(id_file_path, "w", encoding="utf-8") as f_txt:
+        attrs = "".join(f" {k}={quoteattr(v)}" for k, v in root_attrs.items())
+        out.write(f"<?xml version='1.0' encoding='utf-8'?>\n<tv{attrs}>\n")
+        for ch_id, (elem, name) in channels.items():
+            elem.tail = "\n"
+            out.write(ET.tostring(elem, encoding="unicode"))
+            f_txt.write(f"{name} => {ch_id}\n")
+        # Önce tanımlı kanalların programları, sonra kanalı tanımsız olanlar (eski davranış: atılmaz)
+        order = list(channels) + [ch_id for ch_id in merged if ch_id not in channels]
+        for ch_id in order:
+            for programme in merged.get(ch_id, ()):
+                programme.tail = "\n"
+                out.write(ET.tostring(programme, encoding="unicode"))
+        out.write("</tv>\n")
+    os.replace(tmp_path, output_path)
+
+def merge_epg(state, rewindow=False):
+    """Kaynakları indir, kanal id'lerini eşle ve programları önceliğe göre birleştir"""
+    fetched = download_sources(state)
+    if not fetched:
+        raise RuntimeError("Hiçbir EPG kaynağı indirilemedi")
+    used = [url for url, _, _ in fetched]
+    if (not any(changed for _, _, changed in fetched) and state.get("merged_sources") == used
+            and os.path.exists(UPDATED_XML) and not rewindow):
+        return False
+
+    with metrics.stage("transform"):
+        index = ChannelIndex()
+        channels = {}
+        per_source = []
+        root_attrs = None
+        for url, path, _ in fetched:
+            programmes, attrs = read_source(url, path, index, channels)
+            per_source.append(programmes)
+            root_attrs = attrs if root_attrs is None else root_attrs
+            count = sum(len(items) for items in programmes.values())
+            metrics.incr("source_programmes", count)
+            print(f"  📥 {url}: {len(index.source_maps.get(url, {}))} kanal, {count} program")
+        merged = merge_programmes(per_source)
+        report_collisions(index)
+
+    with metrics.stage("save"):
+        write_merged_epg(channels, merged, root_attrs, UPDATED_XML, CHANNEL_ID_FILE)
+
+    total = sum(len(items) for items in merged.values())
+    filled = total - sum(len(items) for items in per_source[0].values())
+    metrics.incr("channels", len(channels))
+    metrics.incr("programmes", total)
+    metrics.incr("gap_filled", filled)
+    state["merged_sources"] = used
+    print(f"✅ {UPDATED_XML} ve {CHANNEL_ID_FILE} oluşturuldu ({len(channels)} kanal, {total} program; "
+          f"{filled} program alt kaynaklardan boşluk doldurdu).")
+    return True
+
+def publish_outputs():
+    """Düz XML'in yanına gzip kopyası ve (isteğe bağlı) kanal parçalarını üret"""
+    with metrics.stage("save"):
+        write_gzip(UPDATED_XML, GZIP_XML)
+        print(f"✅ {GZIP_XML} oluşturuldu.")
+        if EPG_SHARDS_DIR:
+            count = build_shards(UPDATED_XML, CHANNEL_ID_FILE, EPG_SHARDS_DIR)
+            print(f"✅ {count} kanal parçası '{EPG_SHARDS_DIR}' dizinine yazıldı.")
+
 def get_dropbox_access_token():
+    """Önbellekteki token süresi dolmadıysa onu, yoksa yenisini döndür"""
+    try:
+        with open(TOKEN_CACHE_FILE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("expires_at", 0) - 300 > time.time():
+            return cached["access_token"]
+    except (OSError, ValueError, KeyError):
+        pass
+
     url = "https://api.dropbox.com/oauth2/token"
     data = {
         "grant_type": "refresh_token",
@@ -55,19 +438,136 @@ def get_dropbox_access_token():
         "client_id": DROPBOX_APP_KEY,
         "client_secret": DROPBOX_APP_SECRET
     }
-    r = requests.post(url, data=data)
+    r = client.post(url, data=data, retries=2)
     r.raise_for_status()
-    return r.json()["access_token"]
+    token = r.json()
+
+    try:
+        # Token repoya girmesin: dosya .gitignore'da ve sadece sahibi okuyabilir
+        fd = os.open(TOKEN_CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "access_token": token["access_token"],
+                "expires_at": time.time() + token.get("expires_in", 14400),
+            }, f)
+    except OSError as e:
+        print(f"⚠️ Token önbelleğe yazılamadı: {e}")
+
+    return token["access_token"]
+
+def dropbox_content_hash(path):
+    """Dropbox content_hash: 4 MB blokların SHA-256'larının SHA-256'sı"""
+    overall = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(DROPBOX_HASH_BLOCK)
+            if not block:
+                break
+            overall.update(hashlib.sha256(block).digest())
+    return overall.hexdigest()
+
+def remote_content_hash(dbx, remote_path):
+    """Dropbox'taki dosyanın content_hash'i (dosya yoksa None)"""
+    try:
+        return dbx.files_get_metadata(remote_path).content_hash
+    except dropbox.exceptions.ApiError:
+        return None
+
+def remote_folder_hashes(dbx, remote_folder):
+    """Klasördeki dosyaların {yol: content_hash} haritası (tek listeleme ile)"""
+    hashes = {}
+    try:
+        result = dbx.files_list_folder(remote_folder)
+        while True:
+            for entry in result.entries:
+                if isinstance(entry, dropbox.files.FileMetadata):
+                    hashes[entry.path_lower] = entry.content_hash
+            if not result.has_more:
+                break
+            result = dbx.files_list_folder_continue(result.cursor)
+    except dropbox.exceptions.ApiError:
+        pass
+    return hashes
+
+def upload_file(dbx, path, remote_path):
+    """Küçük dosyayı tek istekte, büyüğünü upload session ile parça parça yükle"""
+    size = os.path.getsize(path)
+    mode = dropbox.files.WriteMode.overwrite
+    with open(path, "rb") as f:
+        if size <= UPLOAD_CHUNK_SIZE:
+            dbx.files_upload(f.read(), remote_path, mode=mode)
+            return
+
+        session = dbx.files_upload_session_start(f.read(UPLOAD_CHUNK_SIZE))
+        cursor = dropbox.files.UploadSessionCursor(session_id=session.session_id, offset=f.tell())
+        commit = dropbox.files.CommitInfo(path=remote_path, mode=mode)
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if f.tell() >= size:
+                dbx.files_upload_session_finish(chunk, cursor, commit)
+                return
+            dbx.files_upload_session_append_v2(chunk, cursor)
+            cursor.offset = f.tell()
+
+def upload_if_changed(dbx, path, remote_path, remote_hash=None):
+    """Dropbox'taki içerik aynıysa atla, değilse yükle; yüklendiyse True"""
+    if remote_hash is None:
+        remote_hash = remote_content_hash(dbx, remote_path)
+    if remote_hash == dropbox_content_hash(path):
+        metrics.incr("upload_skipped")
+        return False
+    upload_file(dbx, path, remote_path)
+    metrics.incr("uploaded")
+    return True
 
 def upload_to_dropbox():
-    access_token = get_dropbox_access_token()
-    dbx = dropbox.Dropbox(access_token)
-    with open(UPDATED_XML, "rb") as f:
-        dbx.files_upload(f.read(), DROPBOX_PATH, mode=dropbox.files.WriteMode.overwrite)
-    print(f"✅ {UPDATED_XML} Dropbox'a yüklendi: {DROPBOX_PATH}")
+    """XML, gzip kopyası ve kanal parçalarını yükle; Dropbox'ta aynısı olanları atla"""
+    with metrics.stage("upload"):
+        access_token = get_dropbox_access_token()
+        dbx = dropbox.Dropbox(access_token)
+
+        for path, remote_path in ((UPDATED_XML, DROPBOX_PATH), (GZIP_XML, DROPBOX_GZIP_PATH)):
+            if upload_if_changed(dbx, path, remote_path):
+                print(f"✅ {path} Dropbox'a yüklendi: {remote_path}")
+            else:
+                print(f"⏭️ Dropbox'taki {remote_path} zaten güncel, yükleme atlandı.")
+
+        if EPG_SHARDS_DIR:
+            remote_hashes = remote_folder_hashes(dbx, DROPBOX_SHARDS_PATH)
+            uploaded = 0
+            for file_name in sorted(os.listdir(EPG_SHARDS_DIR)):
+                remote_path = f"{DROPBOX_SHARDS_PATH}/{file_name}"
+                local_path = os.path.join(EPG_SHARDS_DIR, file_name)
+                if upload_if_changed(dbx, local_path, remote_path, remote_hashes.get(remote_path.lower(), "")):
+                    uploaded += 1
+            print(f"✅ Kanal parçaları: {uploaded} dosya yüklendi, geri kalanı güncel.")
 
 # ----------------- Ana Program -----------------
 if __name__ == "__main__":
-    download_xml()
-    update_channels()
-    upload_to_dropbox()
+    metrics.open_spans(RUN_SPANS)
+    try:
+        state = load_state()
+        # Kaynak değişmese de gelecek sınırı ilerlesin diye pencere kaydıysa yeniden derlenir
+        rewindow = window_moved(state)
+        if len(EPG_SOURCES) > 1:
+            changed = merge_epg(state, rewindow)
+        elif EPG_STREAMING:
+            changed = stream_epg(state, rewindow)
+        else:
+            changed = download_xml(state) or (rewindow and os.path.exists(LOCAL_XML))
+            if changed:
+                update_channels()
+
+        if not changed:
+            metrics.incr("not_modified")
+            print("⏭️ Kaynak XML değişmemiş (304), dönüştürme ve yükleme atlandı.")
+        else:
+            publish_outputs()
+            upload_to_dropbox()
+            # Doğrulayıcılar ve pencere zamanı sadece yükleme başarılıysa saklanır
+            remember_window(state)
+            save_state(state)
+    finally:
+        metrics.print_summary()
+        metrics.write_report(RUN_REPORT)
+        metrics.close()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Birleşik playlist derleyicisi - TR/ (update_streams), androiptv.m3u8 (update_worker),
+canlidizi_listesi.m3u (bot) ve nowtv_data.json'ı tek kanal modeline yükler; tüm kanallar
+ve grup başına M3U üretir. tvg-id'ler main.py'nin kanalid.txt eşlemesiyle eşleştirilir.
+
+Artımlı: girdisi değişmeyen kaynak yeniden okunmaz, sadece girdisi değişen grupların
+dosyaları yeniden yazılır (durum: <çıktı>/index.json).
+
+Kullanım:
+    python playlist_compiler.py
+    python playlist_compiler.py --base-url https://raw.githubusercontent.com/umitm0d/Alakart/main/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from epg_merge import make_channel_id, turkish_map
+from run_metrics import RunMetrics
+
+OUTPUT_DIR = os.getenv("PLAYLIST_DIR", "playlists")
+INDEX_NAME = "index.json"
+COMBINED_NAME = "all.m3u"
+# Boşsa playlist adresleri çıktı klasörüne göre göreli yazılır
+BASE_URL = os.getenv("PLAYLIST_BASE_URL", "")
+EPG_URL = os.getenv("PLAYLIST_EPG_URL", "")
+
+YOUTUBE_CONFIG = "turkish.json"
+YOUTUBE_FOLDER = os.getenv("FOLDER_NAME", "TR")
+WORKER_PLAYLIST = "androiptv.m3u8"
+BOT_PLAYLIST = "canlidizi_listesi.m3u"
+CATALOG_FILE = "nowtv_data.json"
+EPG_ID_FILE = "kanalid.txt"
+
+# update_streams alt klasörlerinin görünen grup adları
+SUBFOLDER_GROUPS = {
+    "haber": "Haber",
+    "dizi": "Dizi",
+    "cocuk": "Çocuk",
+    "dini": "Dini",
+    "film": "Film",
+    "diger": "Diğer",
+    "spor": "Spor",
+    "yerel": "Yerel",
+}
+BOT_GROUP = "Canlı Dizi"
+CATALOG_GROUP = "NOW TV Arşivi"
+
+# #EXTINF:-1 key="value" ...,Ad
+EXTINF_ATTRIBUTE = re.compile(r'([\w-]+)="([^"]*)"')
+
+RUN_REPORT = os.getenv("RUN_REPORT", "")
+metrics = RunMetrics("playlist_compiler")
+
+
+@dataclass
+class Channel:
+    """Tüm kaynaklar için ortak kanal kaydı"""
+    key: str
+    name: str
+    url: str
+    group: str
+    source: str
+    logo: str = ""
+    tvg_id: str = ""
+    # "stream" oynatılabilir yayın, "catalog" sadece sayfa bağlantısı (birleşik listeye girmez)
+    kind: str = "stream"
+
+    def to_extinf(self):
+        """Kanalı #EXTINF + adres satırlarına çevir"""
+        attributes = [f'tvg-id="{self.tvg_id}"'] if self.tvg_id else []
+        attributes.append(f'tvg-name="{self.name}"')
+        if self.logo:
+            attributes.append(f'tvg-logo="{self.logo}"')
+        attributes.append(f'group-title="{self.group}"')
+        return f'#EXTINF:-1 {" ".join(attributes)},{self.name}\n{self.url}'
+
+
+def file_hash(*paths):
+    """Dosyaların birleşik SHA-256 özeti; hiçbiri yoksa None"""
+    digest = hashlib.sha256()
+    found = False
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+            found = True
+        except OSError:
+            digest.update(b"\0")
+    return digest.hexdigest() if found else None
+
+
+def group_slug(group):
+    """Grup adından dosya adı"""
+    # turkish_map küçük 'ğ'yi içermiyor; 'İ'.lower() birleşik nokta ürettiği için önce çevrilir
+    slug = re.sub(r"[^a-z0-9]+", "-", group.translate(turkish_map).replace("ğ", "g").lower()).strip("-")
+    return slug or "grup"
+
+
+def parse_m3u(text):
+    """M3U'yu [(öznitelikler, ad, adres)] listesine çevir"""
+    entries = []
+    pending = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXTINF"):
+            head, _, name = line.partition(",")
+            pending = (dict(EXTINF_ATTRIBUTE.findall(head)), name.strip())
+        elif line and not line.startswith("#") and pending is not None:
+            entries.append((pending[0], pending[1], line))
+            pending = None
+    return entries
+
+
+# ----------------- Kaynaklar -----------------
+
+def youtube_inputs(config_path, folder):
+    return [config_path, os.path.join(folder, "manifest.json")]
+
+
+def load_youtube(config_path, folder, base_url, output_dir):
+    """update_streams çıktıları: manifest'te kaydı ve dosyası olan stream'ler"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    try:
+        with open(os.path.join(folder, "manifest.json"), "r", encoding="utf-8") as f:
+            streams = json.load(f).get("streams", {})
+    except (OSError, ValueError):
+        streams = {}
+
+    channels = []
+    for stream in config:
+        entry = streams.get(stream["slug"])
+        if not entry or not entry.get("hash"):
+            continue
+        path = Path(folder) / entry["path"]
+        if base_url:
+            url = base_url.rstrip("/") + "/" + path.as_posix()
+        else:
+            url = Path(os.path.relpath(path, output_dir)).as_posix()
+        subfolder = stream.get("subfolder", "")
+        channels.append(Channel(
+            key=f"youtube:{stream['slug']}",
+            name=stream.get("name", stream["slug"]),
+            url=url,
+            group=SUBFOLDER_GROUPS.get(subfolder, subfolder.capitalize() or "YouTube"),
+            source="youtube",
+            logo=stream.get("logo", ""),
+        ))
+    return channels
+
+
+def load_m3u_source(path, source, default_group):
+    """M3U kaynağı (androiptv.m3u8, canlidizi_listesi.m3u)"""
+    with open(path, "r", encoding="utf-8") as f:
+        entries = parse_m3u(f.read())
+    channels = []
+    for attributes, name, url in entries:
+        name = attributes.get("tvg-name") or name
+        channels.append(Channel(
+            key=f"{source}:{url}",
+            name=name,
+            url=url,
+            group=attributes.get("group-title") or default_group,
+            source=source,
+            logo=attributes.get("tvg-logo", ""),
+            tvg_id=attributes.get("tvg-id", ""),
+        ))
+    return channels
+
+
+def load_catalog(path):
+    """nowtv_data.json dizi kataloğu (izleme sayfası bağlantıları)"""
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    return [
+        Channel(
+            key=f"nowtv:{slug}",
+            name=item.get("isim", slug),
+            url=item.get("link", ""),
+            group=CATALOG_GROUP,
+            source="nowtv",
+            logo=item.get("resim", ""),
+            kind="catalog",
+        )
+        for slug, item in catalog.items()
+        if item.get("link")
+    ]
+
+
+def load_epg_ids(path):
+    """kanalid.txt ('Ad => id') -> {alias: id}"""
+    aliases = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, sep, ch_id = line.rstrip("\n").partition(" => ")
+                if not sep:
+                    continue
+                aliases.setdefault(make_channel_id(name), ch_id)
+                aliases.setdefault(ch_id, ch_id)
+    except OSError:
+        pass
+    return aliases
+
+
+def match_tvg_id(channel, aliases):
+    """Kanal adını main.py'nin id kuralıyla EPG id'sine eşle; eşleşmezse mevcut tvg-id kalır"""
+    name = re.sub(r"^[A-Z]{2}:\s*", "", channel.name)
+    candidates = [make_channel_id(name)]
+    if channel.source == "youtube":
+        candidates.append(channel.key.split(":", 1)[1])
+    for candidate in candidates:
+        if candidate in aliases:
+            return aliases[candidate]
+    return channel.tvg_id
+
+
+# ----------------- Derleme -----------------
+
+def load_index(output_dir):
+    try:
+        with open(os.path.join(output_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_text(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def render(channels, epg_url=""):
+    header = f'#EXTM3U x-tvg-url="{epg_url}"' if epg_url else "#EXTM3U"
+    return "\n".join([header] + [channel.to_extinf() for channel in channels]) + "\n"
+
+
+def compile_playlists(args):
+    """Kaynakları yükle, değişen grupları yeniden yaz; (yazılan, atlanan) grup sayısı döndür"""
+    os.makedirs(args.output_dir, exist_ok=True)
+    index = {} if args.force else load_index(args.output_dir)
+    old_sources = index.get("sources", {})
+    old_groups = index.get("groups", {})
+    # Yerel URL'ler base_url ile üretilir; değişirse tüm kaynaklar ve gruplar yeniden derlenir
+    base_changed = index.get("base_url") != args.base_url
+
+    sources = [
+        ("youtube", youtube_inputs(args.youtube_config, args.youtube_folder),
+         lambda: load_youtube(args.youtube_config, args.youtube_folder, args.base_url, args.output_dir)),
+        ("worker", [args.worker_playlist], lambda: load_m3u_source(args.worker_playlist, "worker", "DeaTHLesS")),
+        ("canlidizi", [args.bot_playlist], lambda: load_m3u_source(args.bot_playlist, "canlidizi", BOT_GROUP)),
+        ("nowtv", [args.catalog], lambda: load_catalog(args.catalog)),
+    ]
+
+    # 1) Kaynaklar: girdi özeti aynıysa (ya da girdi bu ortamda yoksa) önceki kanallar kullanılır
+    new_sources = {}
+    changed_sources = set()
+    with metrics.stage("transform"):
+        for name, inputs, loader in sources:
+            fingerprint = file_hash(*inputs)
+            previous = old_sources.get(name)
+            if fingerprint is None:
+                if previous:
+                    print(f"⏭️ {name}: girdi yok, son derlenen {len(previous['channels'])} kanal korunuyor.")
+                    new_sources[name] = previous
+                continue
+            if previous and previous.get("fingerprint") == fingerprint and not base_changed:
+                new_sources[name] = previous
+                continue
+            try:
+                channels = [asdict(channel) for channel in loader()]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ {name} okunamadı ({e}), önceki kanallar korunuyor.")
+                if previous:
+                    new_sources[name] = previous
+                continue
+            new_sources[name] = {"fingerprint": fingerprint, "channels": channels}
+            changed_sources.add(name)
+            print(f"🔄 {name}: {len(channels)} kanal yüklendi.")
+
+    # EPG eşlemesi bu ortamda yoksa (main.py başka iş akışında çalışır) son kullanılan eşleme kullanılır
+    epg_fingerprint = file_hash(args.epg_ids)
+    if epg_fingerprint is None:
+        epg_fingerprint = index.get("epg_fingerprint")
+        aliases = index.get("epg_ids", {})
+    else:
+        aliases = load_epg_ids(args.epg_ids)
+    epg_changed = epg_fingerprint != index.get("epg_fingerprint")
+
+    # 2) Kanal modeli: grup -> kanallar (kaynak sırası, sonra girdi sırası; aynı anahtar bir kez)
+    groups = {}
+    group_sources = {}
+    seen = set()
+    for name, _, _ in sources:
+        for data in new_sources.get(name, {}).get("channels", []):
+            channel = Channel(**data)
+            if channel.key in seen:
+                continue
+            seen.add(channel.key)
+            channel.tvg_id = match_tvg_id(channel, aliases)
+            groups.setdefault(channel.group, []).append(channel)
+            group_sources.setdefault(channel.group, set()).add(name)
+
+    # 3) Sadece girdisi değişen grupları yeniden yaz
+    written = skipped = 0
+    new_groups = {}
+    with metrics.stage("save"):
+        for group, channels in groups.items():
+            file_name = f"{group_slug(group)}.m3u"
+            path = os.path.join(args.output_dir, file_name)
+            previous = old_groups.get(group)
+            dirty = (epg_changed or base_changed or not previous or not os.path.exists(path)
+                     or group_sources[group] & changed_sources or previous.get("epg_url") != args.epg_url)
+            if not dirty:
+                new_groups[group] = previous
+                skipped += 1
+                continue
+            content = render(channels, args.epg_url)
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if not (previous and previous.get("hash") == digest and os.path.exists(path)):
+                write_text(path, content)
+                written += 1
+            else:
+                skipped += 1
+            new_groups[group] = {"file": file_name, "hash": digest, "count": len(channels),
+                                 "sources": sorted(group_sources[group]), "epg_url": args.epg_url}
+
+        # Artık kanalı kalmayan grupların dosyaları silinir
+        for group, entry in old_groups.items():
+            if group not in new_groups:
+                path = os.path.join(args.output_dir, entry["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+                print(f"🗑️ Grup kaldırıldı: {group}")
+
+        # Birleşik liste sadece oynatılabilir yayınları içerir (katalog sayfaları hariç)
+        combined_path = os.path.join(args.output_dir, COMBINED_NAME)
+        if written or new_groups.keys() != old_groups.keys() or not os.path.exists(combined_path):
+            streams = [c for channels in groups.values() for c in channels if c.kind == "stream"]
+            write_text(combined_path, render(streams, args.epg_url))
+            print(f"✅ {combined_path}: {len(streams)} kanal.")
+
+        index = {
+            "base_url": args.base_url,
+            "sources": new_sources,
+            "epg_fingerprint": epg_fingerprint,
+            "epg_ids": aliases,
+            "groups": new_groups,
+        }
+        write_text(os.path.join(args.output_dir, INDEX_NAME),
+                   json.dumps(index, indent=2, sort_keys=True, ensure_ascii=False) + "\n")
+
+    matched = sum(1 for channels in groups.values() for c in channels if c.tvg_id)
+    metrics.incr("channels", len(seen))
+    metrics.incr("tvg_matched", matched)
+    metrics.incr("groups_written", written)
+    metrics.incr("groups_skipped", skipped)
+    print(f"📺 {len(seen)} kanal, {len(groups)} grup ({written} yazıldı, {skipped} değişmedi), "
+          f"{matched} kanalın tvg-id'si var.")
+    return written, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile all stream sources into combined and per-group M3U playlists")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Output folder (default: %(default)s)")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="URL prefix for local playlists (default: paths relative to the output folder)")
+    parser.add_argument("--epg-url", default=EPG_URL, help="EPG URL written as x-tvg-url in the header")
+    parser.add_argument("--youtube-config", default=YOUTUBE_CONFIG, help="update_streams config")
+    parser.add_argument("--youtube-folder", default=YOUTUBE_FOLDER, help="update_streams output folder")
+    parser.add_argument("--worker-playlist", default=WORKER_PLAYLIST, help="update_worker combined playlist")
+    parser.add_argument("--bot-playlist", default=BOT_PLAYLIST, help="bot.py output playlist")
+    parser.add_argument("--catalog", default=CATALOG_FILE, help="NOW TV series catalog")
+    parser.add_argument("--epg-ids", default=EPG_ID_FILE, help="main.py channel-id mapping (Name => id)")
+    parser.add_argument("--force", action="store_true", help="Ignore the index and rebuild every group")
+    args = parser.parse_args()
+
+    try:
+        compile_playlists(args)
+    finally:
+        metrics.write_report(RUN_REPORT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Ortak çalışma metrikleri - aşama zamanlayıcıları, host başına HTTP sayaçları,
+JSON çalışma raporu ve isteğe bağlı JSONL span kaydı
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Pipeline aşamaları (raporlarda bu sırayla görünür)
+STAGES = ('discover', 'resolve', 'download', 'transform', 'save', 'upload')
+
+
+def percentile(values, pct):
+    """En-yakın-sıra yüzdeliği: sıralı listede ceil(pct/100 * n). eleman"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summarize(durations):
+    return {
+        'count': len(durations),
+        'total_s': round(sum(durations), 4),
+        'mean_s': round(sum(durations) / len(durations), 4) if durations else 0.0,
+        'p50_s': round(percentile(durations, 50), 4),
+        'p95_s': round(percentile(durations, 95), 4),
+        'max_s': round(max(durations), 4) if durations else 0.0,
+    }
+
+
+class RunMetrics:
+    """Bir script çalıştırmasının ölçümlerini toplar"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.stage_durations = {}
+        self.stage_errors = Counter()
+        self.hosts = {}
+        self.counters = Counter()
+        self.info = {}
+        self.sections = {}
+        self._spans_file = None
+        self._lock = threading.Lock()
+        self._context = threading.local()
+
+    # --- span dosyası ---
+
+    def open_spans(self, path):
+        """Her span'i JSONL olarak bu dosyaya ekle"""
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._spans_file = open(path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._spans_file:
+            self._spans_file.close()
+            self._spans_file = None
+
+    def _emit(self, span):
+        if not self._spans_file:
+            return
+        span.update(getattr(self._context, 'attrs', {}))
+        line = json.dumps(span, ensure_ascii=False)
+        with self._lock:
+            self._spans_file.write(line + '\n')
+
+    @contextmanager
+    def context(self, **attrs):
+        """Bu thread'de açılan span'lere ek alanlar (ör. slug) iliştir"""
+        previous = getattr(self._context, 'attrs', {})
+        self._context.attrs = {**previous, **attrs}
+        try:
+            yield
+        finally:
+            self._context.attrs = previous
+
+    # --- kayıt ---
+
+    def record_stage(self, name, elapsed, ok=True, **attrs):
+        """Bir aşamanın süresini kaydet"""
+        with self._lock:
+            self.stage_durations.setdefault(name, []).append(elapsed)
+            if not ok:
+                self.stage_errors[name] += 1
+        self._emit({
+            'type': 'stage',
+            'name': name,
+            'start_s': round(time.perf_counter() - self._t0 - elapsed, 4),
+            'duration_s': round(elapsed, 4),
+            'ok': ok,
+            **attrs,
+        })
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        """with metrics.stage('download'): ... - süreyi ölç, istisnada hata say"""
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record_stage(name, time.perf_counter() - start, ok, **attrs)
+
+    def record_http(self, url, method, status, elapsed, error=None):
+        """Tek bir HTTP isteğinin sonucunu host bazında kaydet"""
+        host = urlparse(url).netloc or url
+        ok = error is None and status is not None and status < 400
+        with self._lock:
+            entry = self.hosts.get(host)
+            if entry is None:
+                entry = self.hosts[host] = {'durations': [], 'errors': 0, 'status': Counter()}
+            entry['durations'].append(elapsed)
+            entry['status'][str(status) if status is not None else type(error).__name__] += 1
+            if not ok:
+                entry['errors'] += 1
+        self._emit({
+            'type': 'http',
+            'method': method,
+            'host': host,
+            'path': urlparse(url).path,
+            'status': status,
+            'error': str(error) if error else None,
+            'start_s': round(time.perf_counter() - self._t0 - elapsed, 4),
+            'duration_s': round(elapsed, 4),
+        })
+
+    def incr(self, name, amount=1):
+        """Serbest sayaç artır"""
+        with self._lock:
+            self.counters[name] += amount
+
+    def set_info(self, **info):
+        """Rapora sabit bilgi ekle (ayarlar, sonuç özeti)"""
+        self.info.update(info)
+
+    def add_section(self, name, provider):
+        """Rapor anında provider() ile doldurulan ek bölüm (ör. bağlantı istatistikleri)"""
+        self.sections[name] = provider
+
+    # --- rapor ---
+
+    def report(self):
+        """Makinece okunabilir çalışma raporu"""
+        with self._lock:
+            ordered = [s for s in STAGES if s in self.stage_durations]
+            ordered += sorted(s for s in self.stage_durations if s not in STAGES)
+            stages = {}
+            for name in ordered:
+                stages[name] = _summarize(self.stage_durations[name])
+                stages[name]['errors'] = self.stage_errors[name]
+
+            hosts = {}
+            for host, entry in sorted(self.hosts.items()):
+                hosts[host] = _summarize(entry['durations'])
+                hosts[host]['errors'] = entry['errors']
+                hosts[host]['status'] = dict(entry['status'])
+
+            report = {
+                'name': self.name,
+                'started_at': int(self.started_at),
+                'wall_s': round(time.perf_counter() - self._t0, 3),
+                'info': dict(self.info),
+                'counters': dict(self.counters),
+                'stages': stages,
+                'hosts': hosts,
+            }
+
+        for name, provider in self.sections.items():
+            report[name] = provider()
+        return report
+
+    def write_report(self, path):
+        """Raporu JSON olarak yaz"""
+        if not path:
+            return None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        return path
+
+    def print_summary(self):
+        """Aşama sürelerini kısaca konsola bas"""
+        report = self.report()
+        print(f"\n⏱ {self.name}: {report['wall_s']:.2f}s")
+        for name, stage in report['stages'].items():
+            print(f"  {name:10} n={stage['count']:<4} total={stage['total_s']:.2f}s "
+                  f"p95={stage['p95_s']:.2f}s errors={stage['errors']}")
+        for host, entry in report.get('connections', {}).items():
+            if 'connections' in entry:
+                print(f"  🔌 {host}: {entry['connections']} bağlantı / {entry['requests']} istek")
@@ -6,14 +6,26 @@ YouTube Stream Updater - Invidious alternatifleri
 import json
 import os
 import sys
-import requests
 import argparse
+import contextlib
+import hashlib
+import heapq
+import random
+import re
+import signal
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import time
-import random
+
+import hls
+from http_client import HttpClient, retry_delay
+from instance_health import InstanceHealth
+from live_cache import LiveVideoCache
+from run_metrics import RunMetrics
 
 # Çalışan Invidious instance'ları
-INVIDIOUS_INSTANCES = [
+DEFAULT_INSTANCES = [
     "https://vid.puffyan.us",
     "https://inv.tux.pizza",
     "https://y.com.sb",
@@ -23,21 +35,123 @@ INVIDIOUS_INSTANCES = [
     "https://inv.odyssey346.dev"
 ]
 
+# INVIDIOUS_INSTANCES ortam değişkeni (virgülle ayrılmış) listeyi ezer
+INVIDIOUS_INSTANCES = [
+    url.strip().rstrip('/')
+    for url in os.environ.get('INVIDIOUS_INSTANCES', '').split(',')
+    if url.strip()
+] or list(DEFAULT_INSTANCES)
+
 # Configuration
 FOLDER_NAME = os.environ.get('FOLDER_NAME', 'streams')
+HEALTH_FILE = os.environ.get('HEALTH_FILE', 'invidious_health.json')
+LIVE_CACHE_FILE = os.environ.get('LIVE_CACHE_FILE', 'live_cache.json')
+LIVE_CACHE_TTL = 48
+RUN_REPORT = os.environ.get('RUN_REPORT', '')
+RUN_SPANS = os.environ.get('RUN_SPANS', '')
+MANIFEST_NAME = 'manifest.json'
+# Çalıştırma günlüğü: biten her stream için bir JSONL satırı (fsync'li); --resume bununla devam eder
+JOURNAL_FILE = os.environ.get('JOURNAL_FILE', 'update_streams.journal.jsonl')
+# --resume: bu kadar saat içinde başarıyla biten stream'ler atlanır
+RESUME_WINDOW = 1
+# Daemon: journal stream sayısının bu katı satıra ulaşınca sıkıştırılır
+JOURNAL_COMPACT_FACTOR = 4
+# --shard i/N çalıştırmalarının kısmi manifest'i (FOLDER_NAME altında)
+SHARD_MANIFEST_NAME = 'manifest.shard-{index}-of-{count}.json'
+KEEP_FAILED_RUNS = 3
+
+# --daemon: imzalı URL'ler süresi dolmadan REFRESH_MARGIN..2*REFRESH_MARGIN sn önce yenilenir
+# (rastgele pay, aynı anda çözülmüş stream'ler aynı anda yenilenmesin diye)
+REFRESH_MARGIN = 900
+# expire bilgisi olmayan stream'lerin yenileme aralığı (cron ile aynı: 6 saat)
+DEFAULT_REFRESH = 6 * 3600
+# Başarısız stream'in tekrar aralığı; her ardışık hatada katlanır, üst sınır DEFAULT_REFRESH
+FAILED_REFRESH = 300
+DAEMON_MAX_SLEEP = 60
+
+# YouTube HLS URL'lerinde her istekte değişen imza/süre parçaları
+VOLATILE_PARAMS = ('expire', 'ei', 'ip', 'sparams', 'sig', 'lsig', 'signature',
+                   'lsparams', 'initcwndbps', 'mh', 'mm', 'mn', 'ms', 'mv', 'mvi', 'pl')
+VOLATILE_URL_PARTS = re.compile(
+    r'/(?:{0})/[^/\s]+|[?&](?:{0})=[^&\s]*'.format('|'.join(VOLATILE_PARAMS))
+)
+# İmzalı URL'lerin son geçerlilik zamanı: .../expire/1700000000/... ya da ?expire=1700000000
+EXPIRE_PATTERN = re.compile(r'(?:/expire/|[?&]expire=)(\d+)')
 TIMEOUT = 30
 MAX_RETRIES = 2
 RETRY_DELAY = 2
+CONCURRENCY = 1
+PER_HOST_LIMIT = 2
 
-# Session oluştur
-session = requests.Session()
-session.headers.update({
+# Instance sağlık skorları (gecikme, başarı oranı, devre kesici)
+health = InstanceHealth(INVIDIOUS_INSTANCES)
+
+# Çıktı manifest'i: slug -> {path, hash, structure_hash, last_success, failures}
+manifest = {}
+
+# Aşama süreleri, host sayaçları, çalışma raporu
+metrics = RunMetrics('update_streams')
+
+# Ortak HTTP istemcisi; instance bazlı tekrar fetch_stream_with_retry'da olduğu için istemci tekrar etmez
+client = HttpClient(retries=0, metrics=metrics, headers={
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'application/json, text/plain, */*',
     'Accept-Language': 'en-US,en;q=0.9',
     'Referer': 'https://yewtu.be/'
 })
 
+# Kanal -> son canlı videoId önbelleği
+live_cache = LiveVideoCache()
+
+# Invidious instance'ı başına aynı anda açık istek sınırı (googlevideo indirmeleri sınırsız)
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+_save_lock = threading.Lock()
+
+# SIGINT/SIGTERM: yeni stream başlatılmaz, süren işler bitince çıkılır
+_stop = threading.Event()
+# Açık journal dosyası (--journal boşsa None) ve içindeki satır sayısı
+_journal = None
+_journal_lines = 0
+
+# Paralel modda her stream'in çıktısı ayrı tutulur, iş bitince blok halinde basılır
+_log_local = threading.local()
+
+def log(message=""):
+    """Satırı bas ya da paralel moddaysa stream'in tamponuna ekle"""
+    buffer = getattr(_log_local, 'buffer', None)
+    if buffer is None:
+        print(message)
+    else:
+        buffer.append(message)
+
+def host_slot(instance):
+    """Instance için istek sınırlayıcı semaforu döndür; instance yoksa sınır yok"""
+    if not instance:
+        return contextlib.nullcontext()
+    with _host_slots_lock:
+        slot = _host_slots.get(instance)
+        if slot is None:
+            slot = threading.BoundedSemaphore(PER_HOST_LIMIT)
+            _host_slots[instance] = slot
+    return slot
+
+def http_get(url, instance=None):
+    """Instance başına sınırı aşmadan GET isteği at; instance verilirse sağlığını kaydet"""
+    with host_slot(instance):
+        start = time.monotonic()
+        try:
+            response = client.get(url, timeout=TIMEOUT)
+        except Exception:
+            if instance:
+                health.record(instance, False, time.monotonic() - start)
+            raise
+    if instance:
+        # 5xx / 429 / 403 instance'ın YouTube'a erişemediğini gösterir
+        ok = response.status_code < 500 and response.status_code not in (403, 429)
+        health.record(instance, ok, time.monotonic() - start)
+    return response
+
 def load_config(config_path):
     """Config dosyasını yükle"""
     try:
@@ -49,9 +163,9 @@ def load_config(config_path):
         print(f"✗ Error loading config: {e}")
         sys.exit(1)
 
-def get_random_instance():
-    """Rastgele bir Invidious instance seç"""
-    return random.choice(INVIDIOUS_INSTANCES)
+def get_instance():
+    """Sağlık skoruna göre bir Invidious instance seç"""
+    return health.pick()
 
 def fetch_stream_from_invidious(stream_config):
     """Invidious API'den stream bilgisi al"""
@@ -59,62 +173,85 @@ def fetch_stream_from_invidious(stream_config):
     stream_id = stream_config['id']
     slug = stream_config['slug']
     
-    instance = get_random_instance()
+    instance = get_instance()
     
     try:
         if stream_type == 'channel':
-            # Kanalın canlı yayınını bul
-            channel_url = f"{instance}/api/v1/channels/{stream_id}"
-            print(f"🎬 {slug} - Checking channel...")
+            log(f"🎬 {slug} - Checking channel...")
             
-            response = session.get(channel_url, timeout=TIMEOUT)
-            if response.status_code == 200:
-                channel_data = response.json()
-                
-                # Son videoları kontrol et
-                videos_url = f"{instance}/api/v1/channels/{stream_id}/videos"
-                videos_response = session.get(videos_url, timeout=TIMEOUT)
-                
-                if videos_response.status_code == 200:
-                    videos_data = videos_response.json()
-                    
-                    # Canlı yayınları bul
-                    for video in videos_data.get('videos', []):
-                        if video.get('liveNow') or video.get('lengthSeconds') == 0:
-                            video_id = video['videoId']
-                            print(f"  ✓ Live stream found: {video_id}")
-                            return get_stream_url_from_video(instance, video_id, slug)
-                    
-                    print(f"  ⚠ No live stream found")
-                    return None
-                else:
-                    print(f"  ✗ Failed to get videos: {videos_response.status_code}")
-                    return None
-            else:
-                print(f"  ✗ Failed to get channel: {response.status_code}")
+            # Önce önbellekteki canlı videoId'yi dene
+            cached_video_id = live_cache.get(stream_id)
+            if cached_video_id:
+                metrics.incr('live_cache_hit')
+                log(f"  → Cached live video: {cached_video_id}")
+                result = get_stream_url_from_video(instance, cached_video_id, slug, require_live=True)
+                if result is not None:
+                    live_cache.put(stream_id, cached_video_id)
+                    return result
+                log("  → Cached video unusable, discovering channel...")
+            
+            # Kanalın canlı yayınını bul
+            video_id = find_live_video(instance, stream_id)
+            if video_id is None:
                 return None
+            if video_id is False:
+                live_cache.drop(stream_id)
+                return None
+            
+            result = get_stream_url_from_video(instance, video_id, slug)
+            if result is not None:
+                live_cache.put(stream_id, video_id)
+            return result
                 
         elif stream_type == 'video':
             # Direkt video
             return get_stream_url_from_video(instance, stream_id, slug)
         else:
-            print(f"✗ Unknown type: {stream_type}")
+            log(f"✗ Unknown type: {stream_type}")
             return None
             
     except Exception as e:
-        print(f"  ✗ Error with {instance}: {e}")
+        log(f"  ✗ Error with {instance}: {e}")
         return None
 
-def get_stream_url_from_video(instance, video_id, slug):
+def find_live_video(instance, channel_id):
+    """Kanalın canlı videoId'sini bul; canlı yayın yoksa False, hata olursa None"""
+    # Son videoları kontrol et
+    videos_url = f"{instance}/api/v1/channels/{channel_id}/videos"
+    with metrics.stage('discover'):
+        videos_response = http_get(videos_url, instance)
+    
+    if videos_response.status_code != 200:
+        log(f"  ✗ Failed to get videos: {videos_response.status_code}")
+        return None
+    
+    videos_data = videos_response.json()
+    
+    # Canlı yayınları bul
+    for video in videos_data.get('videos', []):
+        if video.get('liveNow') or video.get('lengthSeconds') == 0:
+            video_id = video['videoId']
+            log(f"  ✓ Live stream found: {video_id}")
+            return video_id
+    
+    log(f"  ⚠ No live stream found")
+    return False
+
+def get_stream_url_from_video(instance, video_id, slug, require_live=False):
     """Video'dan stream URL'sini al"""
     try:
         # Video bilgilerini al
         video_url = f"{instance}/api/v1/videos/{video_id}"
-        response = session.get(video_url, timeout=TIMEOUT)
+        with metrics.stage('resolve'):
+            response = http_get(video_url, instance)
         
         if response.status_code == 200:
             video_data = response.json()
             
+            if require_live and video_data.get('liveNow') is False:
+                log("  ⚠ Video is no longer live")
+                return None
+            
             # Format stream'lerini kontrol et
             format_streams = video_data.get('formatStreams', [])
             adaptive_formats = video_data.get('adaptiveFormats', [])
@@ -132,25 +269,26 @@ def get_stream_url_from_video(instance, video_id, slug):
             if m3u8_urls:
                 # İlk m3u8 URL'sini kullan
                 m3u8_url = m3u8_urls[0]
-                print(f"  ✓ Found m3u8 URL")
+                log(f"  ✓ Found m3u8 URL")
                 
                 # M3U8 içeriğini indir
-                m3u8_response = session.get(m3u8_url, timeout=TIMEOUT)
+                with metrics.stage('download'):
+                    m3u8_response = http_get(m3u8_url)
                 if m3u8_response.status_code == 200 and '#EXTM3U' in m3u8_response.text:
-                    print(f"  ✓ Valid m3u8 content")
+                    log(f"  ✓ Valid m3u8 content")
                     return m3u8_response.text
                 else:
-                    print(f"  ✗ Invalid m3u8 content")
+                    log(f"  ✗ Invalid m3u8 content")
                     return None
             else:
-                print(f"  ✗ No m3u8 URLs found")
+                log(f"  ✗ No m3u8 URLs found")
                 return None
         else:
-            print(f"  ✗ Failed to get video: {response.status_code}")
+            log(f"  ✗ Failed to get video: {response.status_code}")
             return None
             
     except Exception as e:
-        print(f"  ✗ Error getting video stream: {e}")
+        log(f"  ✗ Error getting video stream: {e}")
         return None
 
 def fetch_stream_with_retry(stream_config):
@@ -159,8 +297,8 @@ def fetch_stream_with_retry(stream_config):
     
     for attempt in range(1, MAX_RETRIES + 1):
         if attempt > 1:
-            delay = RETRY_DELAY * (2 ** (attempt - 2))
-            print(f"  → Retry {attempt}/{MAX_RETRIES} after {delay}s...")
+            delay = retry_delay(attempt - 1, RETRY_DELAY)
+            log(f"  → Retry {attempt}/{MAX_RETRIES} after {delay:.1f}s...")
             time.sleep(delay)
         
         result = fetch_stream_from_invidious(stream_config)
@@ -168,42 +306,27 @@ def fetch_stream_with_retry(stream_config):
             return result
         
         if attempt < MAX_RETRIES:
-            print(f"  → Attempt {attempt} failed, will retry...")
+            log(f"  → Attempt {attempt} failed, will retry...")
     
-    print(f"  ✗ All {MAX_RETRIES} attempts failed for {slug}")
+    log(f"  ✗ All {MAX_RETRIES} attempts failed for {slug}")
     return None
 
-def reverse_hls_quality(m3u8_content):
-    """Kalite sıralamasını ters çevir"""
+def sort_hls_quality(m3u8_content, max_height=None, audio_only=False):
+    """Varyantları gerçek bant genişliğine göre (yüksekten düşüğe) sırala, istenirse filtrele"""
     if not m3u8_content:
         return ""
-        
-    lines = m3u8_content.split('\n')
-    stream_blocks = []
-    current_block = []
+    if not hls.is_master(m3u8_content):
+        return m3u8_content
     
-    for line in lines:
-        if line.startswith('#EXTM3U'):
-            continue
-        elif line.startswith('#EXT-X-STREAM-INF'):
-            if current_block:
-                stream_blocks.append(current_block)
-            current_block = [line]
-        elif current_block:
-            current_block.append(line)
-            if line and not line.startswith('#'):
-                stream_blocks.append(current_block)
-                current_block = []
-    
-    if current_block:
-        stream_blocks.append(current_block)
-    
-    stream_blocks.reverse()
-    result = ['#EXTM3U']
-    for block in stream_blocks:
-        result.extend(block)
-    
-    return '\n'.join(result)
+    playlist = hls.parse_master(m3u8_content)
+    if max_height or audio_only:
+        filtered = playlist.filtered(max_height=max_height, audio_only=audio_only)
+        if filtered.variants:
+            playlist = filtered
+        else:
+            log("  ⚠ No variant matches the filter, keeping all")
+    
+    return playlist.sort_by_bandwidth().dumps()
 
 def get_output_path(stream_config):
     """Çıktı dosya yolunu al"""
@@ -217,22 +340,256 @@ def get_output_path(stream_config):
     
     return output_dir / f"{slug}.m3u8"
 
+def playlist_hash(content):
+    """Playlist içeriğinin SHA-256 özeti"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def structure_hash(content):
+    """İmzalı/süreli URL parametreleri atılmış playlist'in özeti"""
+    stable = VOLATILE_URL_PARTS.sub('', content)
+    return playlist_hash(stable)
+
+def stream_expiry(content):
+    """Playlist'teki imzalı URL'lerin en erken expire zamanı (unix sn), yoksa None"""
+    values = [int(value) for value in EXPIRE_PATTERN.findall(content)]
+    return min(values) if values else None
+
+def atomic_write(path, content):
+    """Geçici dosyaya yazıp rename ile yerine koy"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def get_manifest_path():
+    """Manifest dosyasının yolu"""
+    return Path(FOLDER_NAME) / MANIFEST_NAME
+
+def load_manifest():
+    """Önceki çalıştırmanın manifest'ini yükle"""
+    global manifest
+    try:
+        with open(get_manifest_path(), 'r', encoding='utf-8') as f:
+            manifest = json.load(f).get('streams', {})
+    except (OSError, ValueError):
+        manifest = {}
+    return manifest
+
+def save_manifest():
+    """Manifest'i (slug -> hash, son başarı zamanı) yaz"""
+    manifest_path = get_manifest_path()
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with _save_lock:
+        content = json.dumps({'streams': manifest}, indent=2, sort_keys=True, ensure_ascii=False) + '\n'
+    if manifest_path.exists() and manifest_path.read_text(encoding='utf-8') == content:
+        return False
+    atomic_write(manifest_path, content)
+    return True
+
+def parse_shard(value):
+    """'i/N' -> (i, N); i 1'den başlar"""
+    try:
+        index, count = (int(part) for part in value.split('/', 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 1..{count}, got {index}")
+    return index, count
+
+def shard_key(text):
+    """Çalıştırmalar arasında değişmeyen hash (hash() PYTHONHASHSEED'e bağlı)"""
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest()[:8], 16)
+
+def select_shard(streams, index, count):
+    """Config'in index. parçasını seç
+
+    Her alt klasörün stream'leri slug hash'ine göre sıralanıp parçalara sırayla dağıtılır;
+    böylece her parça her klasörden yaklaşık eşit pay alır. Config sırası korunur.
+    """
+    groups = {}
+    for stream in streams:
+        groups.setdefault(stream.get('subfolder', ''), []).append(stream)
+
+    selected = set()
+    for subfolder, group in groups.items():
+        group.sort(key=lambda stream: (shard_key(stream['slug']), stream['slug']))
+        offset = shard_key(subfolder) % count
+        for position, stream in enumerate(group):
+            if (offset + position) % count == index - 1:
+                selected.add(id(stream))
+    return [stream for stream in streams if id(stream) in selected]
+
+def get_shard_manifest_path(index, count, folder=None):
+    """Shard'ın kısmi manifest yolu"""
+    return Path(folder or FOLDER_NAME) / SHARD_MANIFEST_NAME.format(index=index, count=count)
+
+def save_shard_manifest(index, count, slugs, success, fail):
+    """Shard'a düşen stream'lerin manifest kayıtlarını ve özetini yaz (birleştirme adımı için)"""
+    manifest_path = get_shard_manifest_path(index, count)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with _save_lock:
+        streams = {slug: manifest[slug] for slug in slugs if slug in manifest}
+    content = json.dumps({
+        'shard': f"{index}/{count}",
+        'slugs': sorted(slugs),
+        'streams': streams,
+        'summary': {'success': success, 'failed': fail},
+    }, indent=2, sort_keys=True, ensure_ascii=False) + '\n'
+    atomic_write(manifest_path, content)
+    return manifest_path
+
+def merge_shards(shards_dir):
+    """Shard çıktılarını FOLDER_NAME altında tek ağaçta birleştir; (başarılı, başarısız, bulunan, toplam) döndür
+
+    shards_dir/<artifact>/ altında her shard'ın FOLDER_NAME ağacı, kısmi manifest'i ve durum dosyaları
+    beklenir. Eksik shard'ların stream'leri için mevcut dosyalar ve manifest kayıtları korunur.
+    """
+    load_manifest()
+    success = fail = 0
+    count = None
+    found = set()
+
+    for partial in sorted(Path(shards_dir).glob(f"*/{FOLDER_NAME}/manifest.shard-*-of-*.json")):
+        with open(partial, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index, count = parse_shard(data['shard'])
+        if index in found:
+            print(f"⚠ Duplicate shard {data['shard']} in {partial}, skipped")
+            continue
+        found.add(index)
+        shard_root = partial.parent
+        artifact_root = shard_root.parent
+
+        for slug in data['slugs']:
+            entry = data['streams'].get(slug)
+            previous = manifest.get(slug)
+            # Yol değiştiyse (alt klasör taşındı) ya da shard dosyayı sildiyse eski dosya gider
+            if previous and (entry is None or previous.get('path') != entry['path']):
+                old_file = Path(FOLDER_NAME) / previous['path']
+                if old_file.exists():
+                    old_file.unlink()
+                    metrics.incr('deleted')
+            if entry is None:
+                manifest.pop(slug, None)
+                continue
+
+            source = shard_root / entry['path']
+            target = Path(FOLDER_NAME) / entry['path']
+            if source.exists():
+                content = source.read_text(encoding='utf-8')
+                if not target.exists() or target.read_text(encoding='utf-8') != content:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    atomic_write(target, content)
+                    metrics.incr('written')
+            manifest[slug] = entry
+
+        success += data['summary']['success']
+        fail += data['summary']['failed']
+        if HEALTH_FILE:
+            health.merge(artifact_root / Path(HEALTH_FILE).name)
+        if LIVE_CACHE_FILE:
+            live_cache.merge(artifact_root / Path(LIVE_CACHE_FILE).name)
+        print(f"  ✓ Shard {data['shard']}: {data['summary']['success']} ok, "
+              f"{data['summary']['failed']} failed")
+
+    return success, fail, len(found), count or 0
+
+def load_journal(path):
+    """Journal'daki slug başına son kaydı döndür (yarım yazılmış son satır atlanır)"""
+    records = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record['slug']] = record
+    except OSError:
+        pass
+    return records
+
+def open_journal(path, records):
+    """Journal'ı slug başına son kayıtla yeniden yaz ve eklemeye aç (yeni çalıştırmada records boş)"""
+    global _journal, _journal_lines
+    path = Path(path)
+    if path.parent != Path('.'):
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in records.values():
+            f.write(json.dumps(record, sort_keys=True, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _journal = open(path, 'a', encoding='utf-8')
+    _journal_lines = len(records)
+
+def compact_journal():
+    """Açık journal'ı slug başına son kayda indir"""
+    with _save_lock:
+        path = _journal.name
+        _journal.close()
+        open_journal(path, load_journal(path))
+
+def journal_record(slug, ok):
+    """Stream'in sonucunu ve manifest kaydını journal'a ekle, diske zorla"""
+    global _journal_lines
+    if _journal is None:
+        return
+    with _save_lock:
+        _journal_lines += 1
+        record = {'slug': slug, 'ok': ok, 'at': int(time.time()), 'entry': manifest.get(slug)}
+        _journal.write(json.dumps(record, sort_keys=True, ensure_ascii=False) + '\n')
+        _journal.flush()
+        os.fsync(_journal.fileno())
+
+def resumable_slugs(records, window_hours):
+    """Pencere içinde başarıyla bitmiş ve çıktısı hâlâ duran slug'lar; kayıtları manifest'e geri işlenir"""
+    cutoff = time.time() - window_hours * 3600
+    done = set()
+    for slug, record in records.items():
+        entry = record.get('entry')
+        if not record.get('ok') or record.get('at', 0) < cutoff or not entry:
+            continue
+        output_file = Path(FOLDER_NAME) / entry['path']
+        # Çıktı yoksa ya da başka bir sürümse (ör. CI'da commit edilmeden kaldıysa) yeniden çöz
+        if not output_file.exists() or playlist_hash(output_file.read_text(encoding='utf-8')) != entry.get('hash'):
+            continue
+        manifest[slug] = entry
+        done.add(slug)
+    return done
+
 def delete_old_file(stream_config):
-    """Eski dosyayı sil"""
+    """Art arda KEEP_FAILED_RUNS kez başarısız olan stream'in dosyasını sil"""
+    slug = stream_config['slug']
     output_file = get_output_path(stream_config)
     
     try:
-        if output_file.exists():
+        with _save_lock:
+            entry = manifest.setdefault(slug, {'path': output_file.relative_to(FOLDER_NAME).as_posix()})
+            entry['failures'] = entry.get('failures', 0) + 1
+            
+            if not output_file.exists():
+                return False
+            
+            if entry['failures'] < KEEP_FAILED_RUNS:
+                log(f"  ⚠ Keeping last good file ({entry['failures']}/{KEEP_FAILED_RUNS} failed runs)")
+                return False
+            
             output_file.unlink()
-            print(f"  ⚠ Deleted old file")
+            manifest.pop(slug, None)
+            metrics.incr('deleted')
+            log(f"  ⚠ Deleted old file")
             return True
     except Exception as e:
-        print(f"  ⚠ Could not delete old file: {e}")
+        log(f"  ⚠ Could not delete old file: {e}")
     
     return False
 
 def save_stream(stream_config, m3u8_content):
-    """M3U8'i dosyaya kaydet"""
+    """M3U8'i dosyaya kaydet (içerik değişmediyse dokunma)"""
     if not m3u8_content:
         return False
         
@@ -243,36 +600,291 @@ def save_stream(stream_config, m3u8_content):
     output_dir.mkdir(parents=True, exist_ok=True)
     
     try:
-        reversed_content = reverse_hls_quality(m3u8_content)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(reversed_content)
-        print(f"  ✓ Saved: {output_file}")
+        with metrics.stage('transform'):
+            sorted_content = sort_hls_quality(
+                m3u8_content,
+                max_height=stream_config.get('max_height'),
+                audio_only=stream_config.get('audio_only', False),
+            )
+            content_hash = playlist_hash(sorted_content)
+        
+        with metrics.stage('save'), _save_lock:
+            previous = manifest.get(slug, {})
+            unchanged = previous.get('hash') == content_hash and output_file.exists()
+            if not unchanged:
+                atomic_write(output_file, sorted_content)
+            manifest[slug] = {
+                'path': output_file.relative_to(FOLDER_NAME).as_posix(),
+                'hash': content_hash,
+                'structure_hash': structure_hash(sorted_content),
+                'expires': stream_expiry(sorted_content),
+                'last_success': int(time.time()),
+                'failures': 0,
+            }
+        
+        metrics.incr('unchanged' if unchanged else 'written')
+        if unchanged:
+            log(f"  ✓ Unchanged: {output_file}")
+        else:
+            log(f"  ✓ Saved: {output_file}")
         return True
     except Exception as e:
-        print(f"  ✗ Error saving: {e}")
+        log(f"  ✗ Error saving: {e}")
         return False
 
+def process_stream(stream, index, total):
+    """Tek bir stream'i çöz, kaydet; başarısızsa eski dosyayı sil"""
+    slug = stream.get('slug', 'unknown')
+    log(f"\n[{index}/{total}] {slug}")
+    
+    with metrics.context(slug=slug):
+        start = time.perf_counter()
+        m3u8_content = fetch_stream_with_retry(stream)
+        
+        ok = bool(m3u8_content) and save_stream(stream, m3u8_content)
+        if not ok:
+            delete_old_file(stream)
+        
+        metrics.record_stage('stream', time.perf_counter() - start, ok)
+    journal_record(slug, ok)
+    return ok
+
+def process_stream_buffered(stream, index, total):
+    """Stream'i işle, çıktısını tamponda topla (paralel mod); durdurulduysa (None, [])"""
+    if _stop.is_set():
+        return None, []
+    _log_local.buffer = []
+    try:
+        ok = process_stream(stream, index, total)
+    except Exception as e:
+        log(f"  ✗ Unexpected error: {e}")
+        ok = False
+    finally:
+        lines = _log_local.buffer
+        _log_local.buffer = None
+    return ok, lines
+
+def process_streams(streams):
+    """Stream listesini sırayla ya da paralel işle, (başarılı, başarısız) döndür"""
+    total = len(streams)
+    success = 0
+    fail = 0
+    
+    if CONCURRENCY <= 1:
+        for i, stream in enumerate(streams, 1):
+            if _stop.is_set():
+                break
+            if process_stream(stream, i, total):
+                success += 1
+            else:
+                fail += 1
+    else:
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            futures = [
+                executor.submit(process_stream_buffered, stream, i, total)
+                for i, stream in enumerate(streams, 1)
+            ]
+            for future in as_completed(futures):
+                ok, lines = future.result()
+                if ok is None:
+                    continue
+                print('\n'.join(lines))
+                if ok:
+                    success += 1
+                else:
+                    fail += 1
+    
+    if _stop.is_set():
+        print(f"\n🛑 Stopped: {total - success - fail} stream(s) left for --resume")
+    return success, fail
+
+def install_stop_handler():
+    """SIGINT/SIGTERM'de _stop'u işaretle (CI zaman aşımında yarım iş düzgün kapansın)"""
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: _stop.set())
+
+def next_refresh(entry, now, failures=None):
+    """Manifest kaydına göre stream'in bir sonraki yenileme zamanı
+
+    failures verilirse manifest'teki sayaç yerine o kullanılır (silinen stream'in kaydı manifest'ten düşer).
+    """
+    if failures is None:
+        failures = (entry or {}).get('failures', 0)
+    if failures:
+        return now + min(DEFAULT_REFRESH, FAILED_REFRESH * 2 ** (failures - 1))
+    if not entry or not entry.get('last_success'):
+        return now
+    expires = entry.get('expires')
+    if expires:
+        return max(now, expires - REFRESH_MARGIN * random.uniform(1, 2))
+    return max(now, entry['last_success'] + DEFAULT_REFRESH)
+
+def save_run_state():
+    """Instance sağlığı ve canlı video önbelleğini kaydet"""
+    if HEALTH_FILE:
+        try:
+            health.save(HEALTH_FILE)
+        except Exception as e:
+            print(f"⚠ Could not save instance health: {e}")
+    if LIVE_CACHE_FILE:
+        try:
+            live_cache.save(LIVE_CACHE_FILE)
+        except Exception as e:
+            print(f"⚠ Could not save live cache: {e}")
+
+def run_daemon(streams):
+    """Her stream'i kendi expire zamanından hemen önce yeniden çöz; SIGINT/SIGTERM'e kadar çalışır
+
+    Yenileme zamanları bir öncelik kuyruğunda tutulur; vadesi gelen en fazla CONCURRENCY stream
+    birlikte çözülür, ardından manifest ve durum dosyaları kaydedilir.
+    """
+    now = time.time()
+    # Ardışık hata sayısı daemon'da ayrıca tutulur: KEEP_FAILED_RUNS sonrası silinen stream'in
+    # manifest kaydı düşse de backoff sıfırlanmaz
+    streaks = {stream['slug']: manifest.get(stream['slug'], {}).get('failures', 0) for stream in streams}
+    queue = [(next_refresh(manifest.get(stream['slug']), now, streaks[stream['slug']]), order, stream)
+             for order, stream in enumerate(streams)]
+    heapq.heapify(queue)
+    success = fail = 0
+    announced = None
+    
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        while queue and not _stop.is_set():
+            wait_s = queue[0][0] - time.time()
+            if wait_s > 0:
+                due, order, stream = queue[0]
+                if order != announced and wait_s > 5:
+                    announced = order
+                    print(f"⏳ Next refresh: {stream['slug']} at {time.strftime('%H:%M:%S', time.localtime(due))}")
+                _stop.wait(min(wait_s, DAEMON_MAX_SLEEP))
+                continue
+            
+            batch = []
+            while queue and queue[0][0] <= time.time() and len(batch) < CONCURRENCY:
+                batch.append(heapq.heappop(queue))
+            
+            futures = [
+                executor.submit(process_stream_buffered, stream, order + 1, len(streams))
+                for _, order, stream in batch
+            ]
+            for (_, order, stream), future in zip(batch, futures):
+                ok, lines = future.result()
+                if ok is None:
+                    # Durdurma sinyali geldiğinde başlamamış iş: ne başarı ne hata
+                    continue
+                print('\n'.join(lines))
+                slug = stream['slug']
+                if ok:
+                    success += 1
+                    streaks[slug] = 0
+                else:
+                    fail += 1
+                    streaks[slug] += 1
+                heapq.heappush(queue, (next_refresh(manifest.get(slug), time.time(), streaks[slug]), order, stream))
+            
+            metrics.incr('daemon_batches')
+            # Her yenileme journal'a bir satır ekler; uzun çalışmada slug başına son kayda sıkıştır
+            if _journal is not None and _journal_lines > JOURNAL_COMPACT_FACTOR * len(streams):
+                compact_journal()
+            if save_manifest():
+                print(f"🗂 Manifest updated: {get_manifest_path()}")
+            save_run_state()
+    
+    print("\n🛑 Daemon stopped")
+    return success, fail
+
+def print_health_summary():
+    """Instance skorlarını özetle"""
+    print("\n📊 Instance health:")
+    for instance, entry in health.summary():
+        latency = f"{entry['latency']:.2f}s" if entry['latency'] is not None else "-"
+        state = "OPEN" if entry['opened_at'] is not None else "ok"
+        print(f"  {state:4} {instance}  success={entry['success_rate']:.2f}  latency={latency}  "
+              f"({entry['successes']}✓/{entry['failures']}✗)")
+
 def parse_arguments():
     """Komut satırı argümanlarını parse et"""
     parser = argparse.ArgumentParser(
         description='Update YouTube stream m3u8 playlists using Invidious'
     )
     
-    parser.add_argument('config_files', nargs='+', help='Configuration file(s)')
+    parser.add_argument('config_files', nargs='*', help='Configuration file(s)')
     parser.add_argument('--folder', default=FOLDER_NAME, help='Output folder')
     parser.add_argument('--timeout', type=int, default=TIMEOUT, help='Request timeout')
     parser.add_argument('--retries', type=int, default=MAX_RETRIES, help='Max retries')
+    parser.add_argument('--instances', default=None,
+                        help='Comma-separated Invidious instances (overrides the built-in list)')
+    parser.add_argument('--health-file', default=HEALTH_FILE,
+                        help='Instance health state file (empty to disable)')
+    parser.add_argument('--live-cache', default=LIVE_CACHE_FILE,
+                        help='Channel live-video cache file (empty to disable)')
+    parser.add_argument('--live-cache-ttl', type=float, default=LIVE_CACHE_TTL,
+                        help='Hours a cached live videoId stays valid')
+    parser.add_argument('--keep-failed', type=int, default=KEEP_FAILED_RUNS,
+                        help='Failed runs to tolerate before deleting a playlist')
+    parser.add_argument('--report', default=RUN_REPORT,
+                        help='Write a JSON run report to this path')
+    parser.add_argument('--spans', default=RUN_SPANS,
+                        help='Append per-request JSONL spans to this path')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                        help='Number of streams resolved in parallel (1 = sequential)')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_LIMIT,
+                        help='Max in-flight requests per Invidious instance')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='Process only shard i of N (e.g. 2/4) and write a partial manifest')
+    parser.add_argument('--merge-shards', metavar='DIR', default=None,
+                        help='Merge shard outputs found under DIR into the output folder')
+    parser.add_argument('--journal', default=JOURNAL_FILE,
+                        help='Per-stream run journal (JSONL, fsynced; empty to disable)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip streams the journal shows finished within --resume-window')
+    parser.add_argument('--resume-window', type=float, default=RESUME_WINDOW,
+                        help='Hours a journal entry counts as fresh for --resume')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and re-resolve each stream shortly before its signed URLs expire')
+    parser.add_argument('--refresh-margin', type=int, default=REFRESH_MARGIN,
+                        help='Daemon: refresh this many seconds (x1-2) before expiry')
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.config_files and not args.merge_shards:
+        parser.error('config_files are required unless --merge-shards is given')
+    if args.resume and not args.journal:
+        parser.error('--resume needs a --journal file')
+    if args.daemon and (args.shard or args.merge_shards):
+        parser.error('--daemon cannot be combined with --shard or --merge-shards')
+    return args
 
 def main():
     """Ana fonksiyon"""
     args = parse_arguments()
     
-    global FOLDER_NAME, TIMEOUT, MAX_RETRIES
+    global FOLDER_NAME, HEALTH_FILE, LIVE_CACHE_FILE, KEEP_FAILED_RUNS
+    global TIMEOUT, MAX_RETRIES, CONCURRENCY, PER_HOST_LIMIT, REFRESH_MARGIN, health
     FOLDER_NAME = args.folder
+    HEALTH_FILE = args.health_file
+    LIVE_CACHE_FILE = args.live_cache
+    KEEP_FAILED_RUNS = max(1, args.keep_failed)
+    live_cache.ttl = args.live_cache_ttl * 3600
     TIMEOUT = args.timeout
     MAX_RETRIES = args.retries
+    CONCURRENCY = max(1, args.concurrency)
+    PER_HOST_LIMIT = max(1, args.per_host)
+    REFRESH_MARGIN = max(0, args.refresh_margin)
+    client.resize(max(10, CONCURRENCY * 2))
+    
+    metrics.open_spans(args.spans)
+    metrics.set_info(
+        config_files=args.config_files,
+        shard=f"{args.shard[0]}/{args.shard[1]}" if args.shard else None,
+        concurrency=CONCURRENCY,
+        per_host=PER_HOST_LIMIT,
+        timeout=TIMEOUT,
+        retries=MAX_RETRIES,
+    )
+    
+    if args.instances:
+        INVIDIOUS_INSTANCES[:] = [url.strip().rstrip('/') for url in args.instances.split(',') if url.strip()]
+        health = InstanceHealth(INVIDIOUS_INSTANCES)
     
     print("=" * 50)
     print("YouTube Stream Updater - Invidious")
@@ -281,33 +893,82 @@ def main():
     print(f"Config files: {', '.join(args.config_files)}")
     print(f"Timeout: {TIMEOUT}s")
     print(f"Max retries: {MAX_RETRIES}")
+    print(f"Concurrency: {CONCURRENCY} (max {PER_HOST_LIMIT} per instance)")
     print(f"Available instances: {len(INVIDIOUS_INSTANCES)}")
+    if HEALTH_FILE and health.load(HEALTH_FILE):
+        print(f"Instance health: loaded from {HEALTH_FILE}")
+    if LIVE_CACHE_FILE and live_cache.load(LIVE_CACHE_FILE):
+        print(f"Live cache: {len(live_cache)} channel(s) from {LIVE_CACHE_FILE}")
+    if args.shard:
+        print(f"Shard: {args.shard[0]}/{args.shard[1]}")
     print("=" * 50)
     
     total_success = 0
     total_fail = 0
     
-    for config_file in args.config_files:
-        print(f"\n📄 Processing: {config_file}")
-        print("-" * 50)
-        
-        streams = load_config(config_file)
-        
-        for i, stream in enumerate(streams, 1):
-            slug = stream.get('slug', 'unknown')
-            print(f"\n[{i}/{len(streams)}] {slug}")
+    if args.merge_shards:
+        print(f"\n🧩 Merging shards from: {args.merge_shards}")
+        total_success, total_fail, found, count = merge_shards(args.merge_shards)
+        if not found:
+            print("⚠ No shard output found: previous output kept")
+        elif found < count:
+            print(f"⚠ {count - found}/{count} shard(s) missing: their streams keep the previous output")
+        if save_manifest():
+            print(f"\n🗂 Manifest updated: {get_manifest_path()}")
+    else:
+        load_manifest()
+        records = load_journal(args.journal) if args.resume else {}
+        done = resumable_slugs(records, args.resume_window) if args.resume else set()
+        if args.journal:
+            open_journal(args.journal, records)
+        install_stop_handler()
+    
+    if args.daemon:
+        streams = []
+        for config_file in args.config_files:
+            streams.extend(load_config(config_file))
+        print(f"\n🔁 Daemon mode: {len(streams)} stream(s), refresh {REFRESH_MARGIN}-{2 * REFRESH_MARGIN}s before expiry")
+        total_success, total_fail = run_daemon(streams)
+    elif not args.merge_shards:
+        shard_slugs = []
+        for config_file in args.config_files:
+            if _stop.is_set():
+                break
+            print(f"\n📄 Processing: {config_file}")
+            print("-" * 50)
             
-            m3u8_content = fetch_stream_with_retry(stream)
+            streams = load_config(config_file)
+            if args.shard:
+                streams = select_shard(streams, *args.shard)
+                shard_slugs.extend(stream['slug'] for stream in streams)
+                print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(streams)} stream(s)")
             
-            if m3u8_content:
-                if save_stream(stream, m3u8_content):
-                    total_success += 1
-                else:
-                    total_fail += 1
-                    delete_old_file(stream)
-            else:
-                total_fail += 1
-                delete_old_file(stream)
+            pending = [stream for stream in streams if stream['slug'] not in done]
+            if len(pending) < len(streams):
+                print(f"↩ Resumed: {len(streams) - len(pending)} stream(s) finished within "
+                      f"{args.resume_window:g}h, skipped")
+                metrics.incr('resumed', len(streams) - len(pending))
+                total_success += len(streams) - len(pending)
+            
+            success, fail = process_streams(pending)
+            total_success += success
+            total_fail += fail
+        
+        if args.shard:
+            path = save_shard_manifest(*args.shard, shard_slugs, total_success, total_fail)
+            print(f"\n🗂 Shard manifest: {path}")
+        elif save_manifest():
+            print(f"\n🗂 Manifest updated: {get_manifest_path()}")
+    
+    print_health_summary()
+    metrics.print_summary()
+    metrics.set_info(success=total_success, failed=total_fail)
+    if metrics.write_report(args.report):
+        print(f"📝 Run report: {args.report}")
+    metrics.close()
+    save_run_state()
+    if _journal is not None:
+        _journal.close()
     
     print("\n" + "=" * 50)
     print(f"✅ Complete: {total_success} successful, {total_fail} failed")
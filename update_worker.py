@@ -1,6 +1,15 @@
+import atexit
+import hashlib
+import json
 import os
 import re
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urljoin
+
+import hls
+from http_client import HttpClient
+from run_metrics import RunMetrics
 
 # === ENV DEĞERLERİ ===
 CF_ACCOUNT_ID = os.getenv("CF_ACCOUNT_ID")
@@ -8,36 +17,163 @@ CF_API_TOKEN = os.getenv("CF_API_TOKEN")
 WORKER_NAME = "macyayin"
 BASE_SCRIPT_PATH = "worker.js"
 
-if not CF_ACCOUNT_ID or not CF_API_TOKEN:
-    raise SystemExit("❌ Cloudflare bilgileri eksik! (Secrets kontrol et)")
+# Aday domainler: birazcikspor{i}.xyz, i bu aralıkta
+DOMAIN_FIRST, DOMAIN_LAST = 25, 99
+PROBE_WORKERS = 16
+# Son çalışmanın durumu (bulunan domain numarası vb.)
+STATE_FILE = os.getenv("WORKER_STATE_FILE", "worker_state.json")
+# Kanal tablosu (ad, cid, logo) - yeni kanal eklemek için sadece bu dosya düzenlenir
+CHANNELS_FILE = os.getenv("WORKER_CHANNELS_FILE", "worker_channels.json")
+DEFAULT_LOGO = "https://i.hizliresim.com/pcrhcsx.jpg"
+# Kanal yoklaması: toplam süre bütçesi (sn), istek başına zaman aşımı ve kapalı kanallar için
+# davranış ("mark": ayrı grupta listele, "drop": listeden çıkar)
+PROBE_BUDGET = float(os.getenv("WORKER_PROBE_BUDGET", "20"))
+PROBE_TIMEOUT = 5
+OFFLINE_MODE = os.getenv("WORKER_OFFLINE", "mark")
+# 1 ise worker içerik aynı olsa da yeniden yüklenir
+FORCE_DEPLOY = os.getenv("WORKER_FORCE_DEPLOY", "0") == "1"
+
+# Çalışma raporu (JSON) ve span kaydı (JSONL) yolları - boşsa yazılmaz
+RUN_REPORT = os.getenv("RUN_REPORT", "")
+RUN_SPANS = os.getenv("RUN_SPANS", "")
+metrics = RunMetrics("update_worker")
+metrics.open_spans(RUN_SPANS)
+# Yoklama eşzamanlılığı kadar keep-alive bağlantı; yoklamalar tekrar edilmez, bütçeyle sınırlı
+client = HttpClient(pool_size=PROBE_WORKERS, timeout=10, metrics=metrics)
+
+def finish_metrics():
+    metrics.print_summary()
+    metrics.write_report(RUN_REPORT)
+    metrics.close()
+
+# SystemExit ile erken çıkışlarda da rapor yazılsın
+atexit.register(finish_metrics)
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_FILE)
 
-print("🔍 Aktif domain aranıyor (birazcikspor25..99)...")
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-active_domain = None
-for i in range(25, 100):
+def write_if_changed(path, content, state):
+    """İçerik son yazılanla aynıysa ve dosya duruyorsa yazma; yazıldıysa True"""
+    digest = content_hash(content)
+    outputs = state.setdefault("outputs", {})
+    if outputs.get(path) == digest and os.path.exists(path):
+        metrics.incr("write_skipped")
+        return False
+    with metrics.stage("save"):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    outputs[path] = digest
+    metrics.incr("written")
+    return True
+
+def probe_order(last_index):
+    """Adayları son bulunan numaradan dışa doğru sırala: n, n+1, n-1, n+2, ..."""
+    candidates = list(range(DOMAIN_FIRST, DOMAIN_LAST + 1))
+    if last_index not in candidates:
+        return candidates
+    return sorted(candidates, key=lambda i: (abs(i - last_index), i < last_index))
+
+def probe_domain(i):
     url = f"https://birazcikspor{i}.xyz/"
     try:
-        r = requests.head(url, timeout=5)
-        if r.status_code == 200:
-            active_domain = url
-            break
-    except:
-        continue
+        r = client.head(url, timeout=5, retries=0)
+        return r.status_code == 200
+    except requests.RequestException:
+        return False
+
+def probe_channel(url):
+    """Kanal playlist'ini indir: açık mı, master ise gerçek varyantlar, değilse hedef segment süresi"""
+    try:
+        r = client.get(url, timeout=PROBE_TIMEOUT, retries=0)
+    except requests.RequestException as e:
+        return {"online": False, "error": type(e).__name__}
+    if r.status_code != 200 or "#EXTM3U" not in r.text:
+        return {"online": False, "error": str(r.status_code)}
+
+    # Bozuk playlist (ör. sayısal olmayan BANDWIDTH) başarısız yoklama sayılır
+    try:
+        if hls.is_master(r.text):
+            playlist = hls.parse_master(r.text).sort_by_bandwidth()
+            for variant in playlist.variants:
+                variant.uri = urljoin(r.url, variant.uri)
+            return {"online": True, "master": playlist}
+        return {"online": True, "target_duration": hls.target_duration(r.text)}
+    except ValueError as e:
+        return {"online": False, "error": type(e).__name__}
 
-if not active_domain:
+def probe_channels(urls):
+    """Tüm kanalları eşzamanlı yokla; bütçe dolunca bitmeyenler None (bilinmiyor) kalır"""
+    results = dict.fromkeys(urls)
+    pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS)
+    try:
+        futures = {pool.submit(probe_channel, url): url for url in urls}
+        done, _ = wait(futures, timeout=PROBE_BUDGET)
+        for future in done:
+            results[futures[future]] = future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+def find_active_domain(last_index):
+    """Adayları eşzamanlı yokla; ilk 200 veren bulunca kalan yoklamaları iptal et"""
+    order = probe_order(last_index)
+    pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS)
+    try:
+        # Havuz işleri gönderim sırasıyla alır: son numara ve komşuları ilk turda yoklanır
+        futures = {pool.submit(probe_domain, i): i for i in order}
+        for future in as_completed(futures):
+            if future.result():
+                return futures[future]
+        return None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+if not CF_ACCOUNT_ID or not CF_API_TOKEN:
+    raise SystemExit("❌ Cloudflare bilgileri eksik! (Secrets kontrol et)")
+
+state = load_state()
+last_index = state.get("domain_index")
+print(f"🔍 Aktif domain aranıyor (birazcikspor{DOMAIN_FIRST}..{DOMAIN_LAST}"
+      f"{f', önce {last_index} çevresi' if last_index else ''})...")
+
+with metrics.stage("discover"):
+    active_index = find_active_domain(last_index)
+
+if active_index is None:
     raise SystemExit("❌ Aktif domain bulunamadı.")
 
+active_domain = f"https://birazcikspor{active_index}.xyz/"
+state["domain_index"] = active_index
+save_state(state)
+
 print(f"✅ Aktif domain bulundu: {active_domain}")
 
 # Kanal ID ve Base URL
-html = requests.get(active_domain, timeout=10).text
+with metrics.stage("resolve"):
+    html = client.get(active_domain).text
 m = re.search(r'<iframe[^>]+id="matchPlayer"[^>]+src="event\.html\?id=([^"]+)"', html)
 if not m:
     raise SystemExit("❌ Kanal ID bulunamadı.")
 first_id = m.group(1)
 print(f"📺 İlk kanal ID: {first_id}")
 
-event_source = requests.get(active_domain + "event.html?id=" + first_id, timeout=10).text
+with metrics.stage("resolve"):
+    event_source = client.get(active_domain + "event.html?id=" + first_id).text
 b = re.search(r'var\s+baseurls\s*=\s*\[\s*"([^"]+)"', event_source)
 if not b:
     raise SystemExit("❌ Base URL bulunamadı.")
@@ -45,79 +181,110 @@ base_url = b.group(1)
 print(f"🌐 Base URL bulundu: {base_url}")
 
 # === Kanal listesi ===
-channels = [
-    ("beIN Sport 1 HD","androstreamlivebs1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("beIN Sport 2 HD","androstreamlivebs2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("beIN Sport 3 HD","androstreamlivebs3","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("beIN Sport 4 HD","androstreamlivebs4","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("beIN Sport 5 HD","androstreamlivebs5","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("beIN Sport Max 1 HD","androstreamlivebsm1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("beIN Sport Max 2 HD","androstreamlivebsm2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("S Sport 1 HD","androstreamlivess1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("S Sport 2 HD","androstreamlivess2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tivibu Sport HD","androstreamlivets","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tivibu Sport 1 HD","androstreamlivets1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tivibu Sport 2 HD","androstreamlivets2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tivibu Sport 3 HD","androstreamlivets3","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tivibu Sport 4 HD","androstreamlivets4","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Smart Sport 1 HD","androstreamlivesm1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Smart Sport 2 HD","androstreamlivesm2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Euro Sport 1 HD","androstreamlivees1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Euro Sport 2 HD","androstreamlivees2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii HD","androstreamlivetb","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 1 HD","androstreamlivetb1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 2 HD","androstreamlivetb2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 3 HD","androstreamlivetb3","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 4 HD","androstreamlivetb4","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 5 HD","androstreamlivetb5","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 6 HD","androstreamlivetb6","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 7 HD","androstreamlivetb7","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Tabii 8 HD","androstreamlivetb8","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen HD","androstreamliveexn","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 1 HD","androstreamliveexn1","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 2 HD","androstreamliveexn2","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 3 HD","androstreamliveexn3","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 4 HD","androstreamliveexn4","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 5 HD","androstreamliveexn5","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 6 HD","androstreamliveexn6","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 7 HD","androstreamliveexn7","https://i.hizliresim.com/pcrhcsx.jpg"),
-    ("Exxen 8 HD","androstreamliveexn8","https://i.hizliresim.com/pcrhcsx.jpg"),
-]
+with open(CHANNELS_FILE, "r", encoding="utf-8") as f:
+    channels = [(c["name"], c["cid"], c.get("logo", DEFAULT_LOGO)) for c in json.load(f)]
+
+# --- Kanal yoklaması ---
+print(f"📡 {len(channels)} kanal yoklanıyor (bütçe {PROBE_BUDGET:g}s)...")
+with metrics.stage("probe"):
+    probes = probe_channels([f"{base_url}{cid}.m3u8" for _, cid, _ in channels])
+
+offline, unknown, target_durations = [], [], {}
+for name, cid, _ in channels:
+    probe = probes[f"{base_url}{cid}.m3u8"]
+    if probe is None:
+        unknown.append(name)
+    elif not probe["online"]:
+        offline.append(name)
+    elif probe.get("target_duration"):
+        target_durations[cid] = probe["target_duration"]
+online_count = len(channels) - len(offline) - len(unknown)
+metrics.incr("channels_online", online_count)
+metrics.incr("channels_offline", len(offline))
+metrics.incr("channels_unknown", len(unknown))
+metrics.set_info(offline_channels=offline, target_durations=target_durations)
+print(f"📡 Açık: {online_count}, kapalı: {len(offline)}, yanıtsız (bütçe doldu): {len(unknown)}")
 
 # --- Toplu M3U ---
 lines = ["#EXTM3U"]
 for name, cid, logo in channels:
-    lines.append(f'#EXTINF:-1 tvg-id="sport.tr" tvg-name="TR:{name}" tvg-logo="{logo}" group-title="DeaTHLesS",TR:{name}')
     full_url = f"{base_url}{cid}.m3u8"
+    probe = probes[full_url]
+    group = "DeaTHLesS"
+    # Yanıt alınamayan (bütçe dolan) kanal açık sayılır; sadece kesin kapalılar işaretlenir
+    if probe and not probe["online"]:
+        if OFFLINE_MODE == "drop":
+            continue
+        group = "DeaTHLesS (Kapalı)"
+    lines.append(f'#EXTINF:-1 tvg-id="sport.tr" tvg-name="TR:{name}" tvg-logo="{logo}" group-title="{group}",TR:{name}')
     lines.append(full_url)
 
-with open("androiptv.m3u8", "w", encoding="utf-8") as f:
-    f.write("\n".join(lines))
-print("✅ androiptv.m3u8 faylı oluşturuldu.")
+if base_url != state.get("base_url"):
+    print(f"🔁 Base URL değişti (önceki: {state.get('base_url')})")
+state["base_url"] = base_url
+written_paths = set()
+
+if write_if_changed("androiptv.m3u8", "\n".join(lines), state):
+    print("✅ androiptv.m3u8 faylı oluşturuldu.")
+else:
+    print("⏭️ androiptv.m3u8 değişmedi, yazılmadı.")
+written_paths.add("androiptv.m3u8")
 
 # --- Ayrı M3U dosyaları ---
 out_dir = "channels"
 os.makedirs(out_dir, exist_ok=True)
+changed_files = channel_files = 0
 
 for name, cid, logo in channels:
     file_name = name.replace(" ", "_").replace("/", "_") + ".m3u8"
     full_url = f"{base_url}{cid}.m3u8"
-    content = [
-        "#EXTM3U",
-        "#EXT-X-VERSION:3",
-        f'#EXT-X-STREAM-INF:BANDWIDTH=5500000,AVERAGE-BANDWIDTH=8976000,RESOLUTION=1920x1080,CODECS="avc1.640028,mp4a.40.2",FRAME-RATE=25',
-        full_url
-    ]
-    with open(os.path.join(out_dir, file_name), "w", encoding="utf-8") as f:
-        f.write("\n".join(content))
+    probe = probes[full_url]
+    # drop modunda kapalı kanalın dosyası yazılmaz; önceki dosyası aşağıdaki temizlikte silinir
+    if probe and not probe["online"] and OFFLINE_MODE == "drop":
+        continue
+    if probe and probe.get("master") and probe["master"].variants:
+        # Kaynak master playlist: gerçek varyantlar (bant genişliği, çözünürlük) doğrudan yazılır
+        playlist = probe["master"]
+    else:
+        # Tek kaliteli yayın ya da yoklanamayan kanal: bilinen varsayılan değerler
+        playlist = hls.MasterPlaylist(
+            session_tags=["#EXT-X-VERSION:3"],
+            variants=[hls.Variant(
+                uri=full_url,
+                bandwidth=5500000,
+                average_bandwidth=8976000,
+                resolution=(1920, 1080),
+                codecs="avc1.640028,mp4a.40.2",
+                frame_rate=25,
+            )],
+        )
+    path = os.path.join(out_dir, file_name)
+    if write_if_changed(path, playlist.dumps(), state):
+        changed_files += 1
+    written_paths.add(path)
+    channel_files += 1
 
-print(f"✅ {len(channels)} kanal ayrı '{out_dir}' dizinine yazıldı.")
+# Listeden çıkan (ya da drop modunda kapalı) kanalların eski dosyalarını temizle
+for path in list(state["outputs"]):
+    if path not in written_paths:
+        if os.path.exists(path):
+            os.remove(path)
+        del state["outputs"][path]
+
+print(f"✅ {channel_files} kanal '{out_dir}' dizininde ({changed_files} dosya güncellendi).")
+save_state(state)
 
 # === Worker.js içindeki BASE_URL değiştir ===
 with open(BASE_SCRIPT_PATH, "r", encoding="utf-8") as f:
     js_code = f.read()
 
 new_js = re.sub(r'const BASE_URL\s*=\s*".*?"', f'const BASE_URL = "{base_url}"', js_code)
+worker_hash = content_hash(new_js)
+
+if worker_hash == state.get("worker_hash") and not FORCE_DEPLOY:
+    metrics.incr("upload_skipped")
+    print("⏭️ Worker içeriği son yüklenenle aynı, Cloudflare yüklemesi atlandı.")
+    raise SystemExit(0)
 
 # === Cloudflare'a yükle ===
 url = f"https://api.cloudflare.com/client/v4/accounts/{CF_ACCOUNT_ID}/workers/scripts/{WORKER_NAME}"
@@ -127,9 +294,13 @@ headers = {
 }
 
 print("🚀 Worker yükleniyor (Cloudflare)...")
-r = requests.put(url, headers=headers, data=new_js.encode("utf-8"))
+with metrics.stage("upload"):
+    r = client.put(url, headers=headers, data=new_js.encode("utf-8"), timeout=60)
 
 if r.status_code == 200 and r.json().get("success"):
     print("✅ Worker başarıyla yüklendi.")
+    # Hash sadece başarılı yüklemeden sonra saklanır; hata olursa sonraki çalışma tekrar dener
+    state["worker_hash"] = worker_hash
+    save_state(state)
 else:
     print("❌ Worker yükleme hatası!", r.text)